@@ -87,8 +87,8 @@ class GraphRAGEvaluator:
             retrieved_texts.append(' '.join(text_parts))
         
         combined_text = " ".join(retrieved_texts)
-        emb_query = np.array(custom_embed_model.get_query_embedding(ground_truth)).reshape(1, -1)
-        emb_answer = np.array(custom_embed_model.get_query_embedding(combined_text)).reshape(1, -1)
+        emb_query = np.asarray(custom_embed_model.get_query_embedding(ground_truth), dtype=np.float32).reshape(1, -1)
+        emb_answer = np.asarray(custom_embed_model.get_query_embedding(combined_text), dtype=np.float32).reshape(1, -1)
         return float(cosine_similarity(emb_query, emb_answer)[0][0])
 
     # EVALUATION PIPELINE
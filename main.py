@@ -4,6 +4,8 @@ from pydantic import BaseModel
 from dotenv import load_dotenv
 from services.supabase_client import supabase
 from services.llm_client import llm_client
+from services.db_pool import close_pool, get_pool_stats
+from services.warmup import warmup_clients
 from fastapi.middleware.cors import CORSMiddleware
 from routes.resume_routes import router as resume_router
 from routes.chat_routes import router as chat_router
@@ -20,11 +22,40 @@ from routes.evaluation_routes import router as evaluation_router
 
 import uvicorn
 import os 
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 load_dotenv()  
 
 app = FastAPI()
 
+# Log records are queued by the request handlers and written to stdout by a background listener thread,
+# so slow console I/O doesn't stall the event loop
+log_queue = queue.Queue(-1)
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = QueueListener(log_queue, log_stream_handler, respect_handler_level=True)
+
+@app.on_event("startup")
+def start_log_listener():
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    log_listener.start()
+
+@app.on_event("shutdown")
+def stop_log_listener():
+    log_listener.stop()
+
+@app.on_event("startup")
+async def warm_up_clients():
+    await warmup_clients()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await close_pool()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  
@@ -86,6 +117,10 @@ app.include_router(schedule_router, prefix="/chat", tags=["Schedule Parser"])
 
 
 
+@app.get("/health/db", tags=["Supabase Helper"])
+def get_db_pool_stats():
+    return get_pool_stats()
+
 @app.get("/profiles", tags=["Supabase Helper"])
 def get_profiles():
     response = (
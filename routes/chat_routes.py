@@ -8,7 +8,7 @@ from services.vector_store import VectorStore
 from services.supabase_client import supabase
 from utils.json_parser import format_response
 from services.github.github_analysis import GitHubAnalysisService  
-from services.rag_factory import RAGFactory
+from services.rag_factory import rag_factory
 from config.feature_flags import feature_flags
 from utils.timer import time_this_function
 import os
@@ -53,7 +53,6 @@ def chat(request: ChatRequest):
         query_embedding = embedder.generate_embedding(request.message)
         # TODO: possibly add more stuff from the original resume(?) since they are in chunks 
         if feature_flags.ENABLE_CUSTOM_RAG or feature_flags.ENABLE_GRAPH_RAG:
-            rag_factory = RAGFactory()
             matches = rag_factory.search_candidates(
                 query_text=request.message,
                 top_k=10,
@@ -16,7 +16,7 @@ async def query_candidates_customrag(request: CustomRAGQueryRequest):
     Endpoint for recruiters to search candidates using the Custom RAG approach.
     """
     try:
-        results = customrag_service.query_custom_rag(
+        results = await customrag_service.query_custom_rag_async(
             query_text=request.query,
             top_k=request.top_k,
             filters=request.filters
@@ -6,9 +6,9 @@ from services.embedder import embedder
 from services.vector_store import VectorStore
 from services.supabase_client import supabase
 from services.cover_letter_service import coverLetterService
+from services.http_client import http_session
 import tempfile
 import os
-import requests
 
 router = APIRouter()
 
@@ -42,7 +42,7 @@ async def process_resume(student_id: str = Form(...)):
 
         # Download PDF
         print("Downloading resume...")
-        response = requests.get(resume_url, timeout=30)
+        response = http_session.get(resume_url, timeout=30)
         if response.status_code != 200:
             raise HTTPException(
                 status_code=400,
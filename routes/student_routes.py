@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Form
-from typing import List, Optional, Dict
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Iterator
 from pydantic import BaseModel
 from services.resume_parser import ResumeParser
 from services.embedder import embedder
@@ -7,15 +8,26 @@ from services.vector_store import VectorStore
 from services.supabase_client import supabase
 from services.cover_letter_service import coverLetterService
 from services.llm_client import llm_client
+import asyncio
 import tempfile
 import os
-import requests
-import traceback
+import json
+import logging
+from cachetools import TTLCache
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 parser = ResumeParser()
 
+# Persona prefix per (student, profile fields it uses) - no need to rebuild it every chatbot turn,
+# and a profile edit changes the key so the new details are used on the next turn
+persona_prefix_cache = TTLCache(maxsize=2048, ttl=3600)
+
+# Query embeddings for chatbot messages - follow-up turns often repeat the same question
+message_embedding_cache = TTLCache(maxsize=4096, ttl=3600)
+
 class JobIDs(BaseModel):
     job_ids: List[str]
 
@@ -23,6 +35,10 @@ class CoverLetterRequest(BaseModel):
     student_id: str
     job_ids: List[str]
 
+class CoverLetterStreamRequest(BaseModel):
+    student_id: str
+    job_id: str
+
 class RefinementRequest(BaseModel):
     original_letter: str
     instruction: str    
@@ -33,6 +49,122 @@ class ChatbotRequest(BaseModel):
     temperature: float = 0.7
     conversation_history: Optional[List[Dict[str, str]]] = None  # For multi-turn conversations    
 
+def build_persona_prefix(student_profile: Dict) -> str:
+    """
+    Build the stable part of the chatbot system prompt for a student.
+    Cached on the student id plus the profile fields it is built from.
+    """
+    student_id = student_profile.get("id")
+    student_name = student_profile.get("name", "Student")
+    skills = student_profile.get("skills", "various skills")
+    education = student_profile.get("education", "education details")
+
+    # skills / education may be lists, so key on their text form (what the prompt uses anyway)
+    cache_key = (student_id, student_name, str(skills), str(education))
+    if cache_key in persona_prefix_cache:
+        return persona_prefix_cache[cache_key]
+
+    persona_prefix = f"""You are {student_name}, a student with experience in {skills}. 
+You have {education} background. You are answering questions in a job interview or professional context.
+
+Answer questions about yourself based on the provided information from your resume and GitHub projects.
+Be confident, professional, and back up your claims with specific examples and evidence from your experience.
+If asked about something not in the provided information, say you don't have experience in that area or ask for clarification.
+Keep answers concise but informative."""
+
+    if student_id:
+        persona_prefix_cache[cache_key] = persona_prefix
+    return persona_prefix
+
+
+def build_chatbot_system_prompt(payload: ChatbotRequest) -> str:
+    """
+    Build the digital twin system prompt for a chatbot turn: cached persona prefix,
+    retrieved resume/GitHub context and the last few messages of history.
+    """
+    student_id = payload.student_id
+    message = payload.message
+    conversation_history = payload.conversation_history or []
+    
+    # Get student profile
+    profile_response = supabase.table("profiles").select("*").eq("id", student_id).single().execute()
+    if not profile_response.data:
+        raise HTTPException(status_code=404, detail="Student profile not found.")
+    student_profile = profile_response.data
+    
+    # Generate embedding for the question (reuse it if this message was already embedded)
+    query_embedding = message_embedding_cache.get(message)
+    if query_embedding is None:
+        query_embedding = embedder.generate_embedding(message)
+        message_embedding_cache[message] = query_embedding
+    
+    # Get full resume text from resume_embeddings table
+    full_resume_data = VectorStore.get_resume_by_student_id(student_id)
+    context_parts = []
+    if full_resume_data and full_resume_data.get("resume_text"):
+        context_parts.append(f"Full Resume: {full_resume_data['resume_text']}")
+    
+    # Search unified portfolio for relevant information
+    relevant_chunks = VectorStore.search_unified_portfolio(
+        query_embedding=query_embedding,
+        student_id=student_id,
+        top_k=5,
+        threshold=0.0  # Low threshold to get more context
+    )
+    
+    # Build context from relevant chunks
+    for chunk in relevant_chunks:
+        source = chunk.get("source", "")
+        if source == "resume":
+            text = chunk.get("resume_text", "")
+            context_parts.append(f"From Resume: {text}")
+        elif source == "github":
+            repo_name = chunk.get("repo_name", "")
+            text = chunk.get("text", "")
+            metadata = chunk.get("metadata", {})
+            language = metadata.get("language", "N/A")
+            stars = metadata.get("stars", 0)
+            context_parts.append(f"From GitHub Project '{repo_name}' ({language}, {stars}⭐): {text}")
+    
+    context = "\n\n".join(context_parts) if context_parts else "No relevant information found in resume or projects."
+    
+    # Build system prompt: stable persona prefix first so provider-side prefix caching can hit it,
+    # followed by the per-turn context and the last few messages of history
+    persona_prefix = build_persona_prefix(student_profile)
+    history_str = "\n".join(
+        f"{'You' if msg['role'] == 'assistant' else 'Interviewer'}: {msg['content']}"
+        for msg in conversation_history[-4:]
+    ) if conversation_history else "No previous conversation."
+    
+    system_prompt = "".join([
+        persona_prefix,
+        "\n\n# Context\nAvailable information about you:\n",
+        context,
+        "\n\n# History\nPrevious conversation context:\n",
+        history_str,
+        "\n"
+    ])
+    
+    return system_prompt
+
+def sse_events(token_iter: Iterator[str]) -> Iterator[str]:
+    """Wrap a stream of LLM text chunks as Server-Sent Events"""
+    for chunk in token_iter:
+        yield f"data: {json.dumps({'delta': chunk})}\n\n"
+    yield "data: [DONE]\n\n"
+
+def find_relevant_resume_texts(student_id: str, jd_text: str) -> List[str]:
+    """Parts of the student's resume most relevant to a job description"""
+    # Embed the JD
+    query_embedding = embedder.generate_embedding(jd_text)
+    
+    # Find relevant parts of the student's resume
+    relevant_chunks_data = VectorStore.search_student_resume(
+        student_id=student_id,
+        query_embedding=query_embedding
+    )
+    return [chunk['resume_text'] for chunk in relevant_chunks_data]
+
 @router.post("/feedback")
 async def get_resume_feedback(student_id: str = Form(...)):
     """
@@ -45,27 +177,42 @@ async def get_resume_feedback(student_id: str = Form(...)):
         JSON with student_id and feedback text
     """
     try:
-        print(f"[Feedback] Received request for student_id: {student_id}")
+        logger.info("[Feedback] Received request for student_id: %s", student_id)
         
-        resume_data = VectorStore.get_resume_by_student_id(student_id)
+        resume_data = await asyncio.to_thread(VectorStore.get_resume_by_student_id, student_id)
         if not resume_data:
-            print(f"[Feedback] Resume not found for student_id: {student_id}")
+            logger.warning("[Feedback] Resume not found for student_id: %s", student_id)
             raise HTTPException(status_code=404, detail=f"Resume not found for student ID: {student_id}")
         
-        print(f"[Feedback] Resume found, generating feedback...")
-        feedback = coverLetterService.generate_resume_feedback(resume_data["resume_text"])
-        print(f"[Feedback] Feedback generated successfully")
+        logger.info("[Feedback] Resume found, generating feedback...")
+        feedback = await asyncio.to_thread(coverLetterService.generate_resume_feedback, resume_data["resume_text"])
+        logger.info("[Feedback] Feedback generated successfully")
         
         return {"student_id": student_id, "feedback": feedback}
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[Feedback] Error occurred: {str(e)}")
-        traceback.print_exc()
+        logger.exception("[Feedback] Error occurred: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate feedback: {str(e)}")
 
 
+@router.post("/feedback/stream")
+async def stream_resume_feedback(student_id: str = Form(...)):
+    """
+    Streaming version of /feedback.
+    Sends the feedback as Server-Sent Events (`data: {"delta": "..."}`) as the LLM generates it,
+    ending with `data: [DONE]`.
+    """
+    resume_data = await asyncio.to_thread(VectorStore.get_resume_by_student_id, student_id)
+    if not resume_data:
+        logger.warning("[Feedback] Resume not found for student_id: %s", student_id)
+        raise HTTPException(status_code=404, detail=f"Resume not found for student ID: {student_id}")
+    
+    token_iter = coverLetterService.stream_resume_feedback(resume_data["resume_text"])
+    return StreamingResponse(sse_events(token_iter), media_type="text/event-stream")
+
+
 @router.post("/generate-cover-letters")
 async def generate_cover_letters_package(payload: CoverLetterRequest):
     student_id = payload.student_id
@@ -73,12 +220,17 @@ async def generate_cover_letters_package(payload: CoverLetterRequest):
 
     job = None
     try:
-        profile_response = supabase.table("profiles").select("*").eq("id", student_id).single().execute()
+        # Profile and job descriptions are independent lookups - fetch them together
+        profile_response, jobs = await asyncio.gather(
+            asyncio.to_thread(
+                lambda: supabase.table("profiles").select("*").eq("id", student_id).single().execute()
+            ),
+            coverLetterService.get_jds_by_ids(job_ids)
+        )
         if not profile_response.data:
             raise HTTPException(status_code=404, detail="Student profile not found.")
         student_profile = profile_response.data
 
-        jobs = coverLetterService.get_jds_by_ids(job_ids)
         if not jobs:
             raise HTTPException(status_code=404, detail="No job descriptions found for given IDs")
 
@@ -89,18 +241,11 @@ async def generate_cover_letters_package(payload: CoverLetterRequest):
             if not jd_text:
                 continue
             
-            # Embed the JD
-            query_embedding = embedder.generate_embedding(jd_text)
-            
-            # Find relevant parts of the student's resume
-            relevant_chunks_data = VectorStore.search_student_resume(
-                student_id=student_id,
-                query_embedding=query_embedding
-            )
-            relevant_texts = [chunk['resume_text'] for chunk in relevant_chunks_data]
+            relevant_texts = await asyncio.to_thread(find_relevant_resume_texts, student_id, jd_text)
 
             # Generate the cover letter
-            cover_letter = coverLetterService.generate_cover_letter_for_job(
+            cover_letter = await asyncio.to_thread(
+                coverLetterService.generate_cover_letter_for_job,
                 job_description=jd_text,
                 relevant_experience_chunks=relevant_texts,
                 student_profile=student_profile
@@ -120,20 +265,58 @@ async def generate_cover_letters_package(payload: CoverLetterRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.post("/generate-cover-letter/stream")
+async def stream_cover_letter(payload: CoverLetterStreamRequest):
+    """
+    Streaming version of /generate-cover-letters for a single job.
+    Returns Server-Sent Events: `data: {"delta": "..."}` per chunk, then `data: [DONE]`.
+    """
+    profile_response, jobs = await asyncio.gather(
+        asyncio.to_thread(
+            lambda: supabase.table("profiles").select("*").eq("id", payload.student_id).single().execute()
+        ),
+        coverLetterService.get_jds_by_ids([payload.job_id])
+    )
+    if not profile_response.data:
+        raise HTTPException(status_code=404, detail="Student profile not found.")
+    if not jobs or not jobs[0].get("description"):
+        raise HTTPException(status_code=404, detail="No job description found for given ID")
+
+    jd_text = jobs[0]["description"]
+    relevant_texts = await asyncio.to_thread(find_relevant_resume_texts, payload.student_id, jd_text)
+
+    token_iter = coverLetterService.stream_cover_letter_for_job(
+        job_description=jd_text,
+        relevant_experience_chunks=relevant_texts,
+        student_profile=profile_response.data
+    )
+    return StreamingResponse(sse_events(token_iter), media_type="text/event-stream")
+
 @router.post("/refine-cover-letter")
 async def refine_cover_letter_endpoint(payload: RefinementRequest):
     try:
-        refined_text = coverLetterService.refine_cover_letter(
+        refined_text = await asyncio.to_thread(
+            coverLetterService.refine_cover_letter,
             original_letter=payload.original_letter,
             user_instruction=payload.instruction
         )
         return {"refined_letter": refined_text}
     except Exception as e:
-        print("--- AN UNEXPECTED ERROR OCCURRED in refine-cover-letter ---")
-        traceback.print_exc()
-        print("-------------------------------------------------------")
+        logger.exception("Unexpected error in refine-cover-letter: %s", e)
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
 
+@router.post("/refine-cover-letter/stream")
+async def stream_refine_cover_letter(payload: RefinementRequest):
+    """
+    Streaming version of /refine-cover-letter.
+    Returns Server-Sent Events: `data: {"delta": "..."}` per chunk, then `data: [DONE]`.
+    """
+    token_iter = coverLetterService.stream_refine_cover_letter(
+        original_letter=payload.original_letter,
+        user_instruction=payload.instruction
+    )
+    return StreamingResponse(sse_events(token_iter), media_type="text/event-stream")
+
 @router.post("/chatbot")
 async def candidate_chatbot(payload: ChatbotRequest):
     """
@@ -149,76 +332,14 @@ async def candidate_chatbot(payload: ChatbotRequest):
         JSON with response from the chatbot
     """
     try:
-        student_id = payload.student_id
-        message = payload.message
-        temperature = payload.temperature
-        conversation_history = payload.conversation_history or []
-        
-        # Get student profile
-        profile_response = supabase.table("profiles").select("*").eq("id", student_id).single().execute()
-        if not profile_response.data:
-            raise HTTPException(status_code=404, detail="Student profile not found.")
-        student_profile = profile_response.data
-        
-        # Generate embedding for the question
-        query_embedding = embedder.generate_embedding(message)
-        
-        # Get full resume text from resume_embeddings table
-        full_resume_data = VectorStore.get_resume_by_student_id(student_id)
-        context_parts = []
-        if full_resume_data and full_resume_data.get("resume_text"):
-            context_parts.append(f"Full Resume: {full_resume_data['resume_text']}")
-        
-        # Search unified portfolio for relevant information
-        relevant_chunks = VectorStore.search_unified_portfolio(
-            query_embedding=query_embedding,
-            student_id=student_id,
-            top_k=5,
-            threshold=0.0  # Low threshold to get more context
-        )
-        
-        # Build context from relevant chunks
-        for chunk in relevant_chunks:
-            source = chunk.get("source", "")
-            if source == "resume":
-                text = chunk.get("resume_text", "")
-                context_parts.append(f"From Resume: {text}")
-            elif source == "github":
-                repo_name = chunk.get("repo_name", "")
-                text = chunk.get("text", "")
-                metadata = chunk.get("metadata", {})
-                language = metadata.get("language", "N/A")
-                topics = metadata.get("topics", [])
-                stars = metadata.get("stars", 0)
-                context_parts.append(f"From GitHub Project '{repo_name}' ({language}, {stars}⭐): {text}")
-        
-        context = "\n\n".join(context_parts) if context_parts else "No relevant information found in resume or projects."
-        
-        # Build system prompt
-        student_name = student_profile.get("name", "Student")
-        skills = student_profile.get("skills", "various skills")
-        education = student_profile.get("education", "education details")
-        
-        system_prompt = f"""You are {student_name}, a student with experience in {skills}. 
-You have {education} background. You are answering questions in a job interview or professional context.
-
-Answer questions about yourself based on the provided information from your resume and GitHub projects.
-Be confident, professional, and back up your claims with specific examples and evidence from your experience.
-If asked about something not in the provided information, say you don't have experience in that area or ask for clarification.
-Keep answers concise but informative.
-
-Available information about you:
-{context}
-
-Previous conversation context:
-{chr(10).join([f"{'You' if msg['role'] == 'assistant' else 'Interviewer'}: {msg['content']}" for msg in conversation_history[-4:]]) if conversation_history else 'No previous conversation.'}
-"""
+        system_prompt = await asyncio.to_thread(build_chatbot_system_prompt, payload)
         
         # Generate response
-        response = llm_client.generate_text(
+        response = await asyncio.to_thread(
+            llm_client.generate_text,
             system_prompt=system_prompt,
-            user_prompt=message,
-            temperature=temperature
+            user_prompt=payload.message,
+            temperature=payload.temperature
         )
         
         return {"response": response}
@@ -226,6 +347,29 @@ Previous conversation context:
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[Chatbot] Error occurred: {str(e)}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Failed to generate chatbot response: {str(e)}")
\ No newline at end of file
+        logger.exception("[Chatbot] Error occurred: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to generate chatbot response: {str(e)}")
+
+
+@router.post("/chatbot/stream")
+async def candidate_chatbot_stream(payload: ChatbotRequest):
+    """
+    Streaming version of /chatbot.
+    Sends the response as Server-Sent Events (`data: {"delta": "..."}`) as the LLM generates it,
+    ending with `data: [DONE]`.
+    """
+    try:
+        system_prompt = await asyncio.to_thread(build_chatbot_system_prompt, payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[Chatbot] Error occurred: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to generate chatbot response: {str(e)}")
+    
+    token_iter = llm_client.generate_text_stream(
+        system_prompt=system_prompt,
+        user_prompt=payload.message,
+        temperature=payload.temperature
+    )
+    return StreamingResponse(sse_events(token_iter), media_type="text/event-stream")
+
@@ -6,6 +6,7 @@ This is the "brain" of the agentic system.
 """
 
 import asyncio
+import logging
 from typing import List, Dict, Optional
 from .base_agent import AgentState, AgentDecision, ToolResult, ToolName
 from .tools.search_tool import SearchCandidatesTool
@@ -13,6 +14,11 @@ from .tools.github_tool import GitHubAnalysisTool
 from .tools.personality_tool import PersonalityAnalysisTool
 from .tools.ranking_tool import RankingTool
 
+logger = logging.getLogger(__name__)
+
+# Enrichment tools that only read state.candidates and write their own keys, so they can share an iteration
+PARALLEL_SAFE_TOOLS = {"analyze_github", "get_personality"}
+
 
 class AgenticRecruitmentOrchestrator:
     """
@@ -63,93 +69,154 @@ class AgenticRecruitmentOrchestrator:
             max_iterations=max_iterations
         )
         
-        print(f"\n{'='*60}")
-        print(f"🤖 AGENTIC ORCHESTRATOR STARTED")
-        print(f"   Router: {self.llm_router.config.model_name}")
-        print(f"   Goal: Find {min_candidates}+ candidates with fit_score >= {min_fit_score}")
-        print(f"   Query: {query[:80]}...")
-        print(f"{'='*60}\n")
+        logger.info(
+            "🤖 AGENTIC ORCHESTRATOR STARTED | router=%s | goal=%d+ candidates with fit_score >= %s | query=%.80s...",
+            self.llm_router.config.model_name, min_candidates, min_fit_score, query
+        )
         
         # Agent decision loop
         while state.should_continue():
             state.iterations += 1
             
-            print(f"\n{'─'*60}")
-            print(f"🔄 Iteration {state.iterations}/{state.max_iterations}")
-            print(f"   Candidates: {len(state.candidates)}, Enriched: {len(state.enriched_candidates)}, Ranked: {len(state.final_rankings)}")
-            print(f"{'─'*60}")
-            
             # 🧠 Agent decides next action using LLM
-            decision = await self.llm_router.decide_next_action(
-                state=state,
-                available_tools=[t.to_dict() for t in self.tools.values()]
-            )
+            decision = await self._decide_with_prefetch(state)
             
-            print(f"\n🧠 Agent Decision:")
-            print(f"   Tool: {decision.tool_name}")
-            print(f"   Reasoning: {decision.reasoning}")
-            print(f"   Confidence: {decision.confidence:.2f}")
+            # One line per iteration; the state counts are only built if INFO is enabled
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "🔄 iter %d/%d cands=%d enriched=%d ranked=%d decision=%s confidence=%.2f reasoning=%s",
+                    state.iterations, state.max_iterations,
+                    len(state.candidates), len(state.enriched_candidates), len(state.final_rankings),
+                    decision.tool_name, decision.confidence, decision.reasoning
+                )
             
             # Check for finish command
             if decision.tool_name == "finish":
-                print("\n✅ Agent decided to finish")
+                logger.info("✅ Agent decided to finish")
                 state.goal_met = state.check_goal()
                 break
             
-            # Execute the chosen tool
-            tool = self.tools.get(decision.tool_name)
-            if not tool:
-                print(f"   ⚠️ Unknown tool: {decision.tool_name}, skipping")
+            # Execute the chosen tool(s)
+            tools = []
+            for name in decision.planned_tools():
+                tool = self.tools.get(name)
+                if not tool:
+                    logger.warning("⚠️ Unknown tool: %s, skipping", name)
+                    continue
+                tools.append(tool)
+            if not tools:
                 continue
             
-            result = await tool.execute(state, decision.parameters)
-            
-            # Log execution
-            state.add_execution_log(decision, result)
-            
-            if not result.success:
-                print(f"   ⚠️ Tool execution had errors (continuing anyway)")
+            for result in await self._execute_tools(tools, state, decision.parameters):
+                # Log execution
+                state.add_execution_log(decision, result)
+                
+                if not result.success:
+                    logger.warning("⚠️ Tool %s had errors (continuing anyway)", result.tool_name)
             
             # Debug: Show state after tool execution
-            print(f"\n   📊 State after tool execution:")
-            print(f"      - candidates: {len(state.candidates)}")
-            print(f"      - enriched_candidates: {len(state.enriched_candidates)}")
-            print(f"      - final_rankings: {len(state.final_rankings)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "📊 State after %s: candidates=%d enriched_candidates=%d final_rankings=%d",
+                    ", ".join(t.name for t in tools), len(state.candidates),
+                    len(state.enriched_candidates), len(state.final_rankings)
+                )
             
             # Check if goal achieved
             if state.check_goal():
-                print(f"\n🎯 Goal achieved! Found {len([c for c in state.final_rankings if c.get('fit_score', 0) >= state.min_fit_score])} high-quality candidates")
+                logger.info("🎯 Goal achieved! Found %d high-quality candidates", state.qualified_count)
                 state.goal_met = True
                 break
         
         # Final summary
-        print(f"\n{'='*60}")
-        print(f"📊 AGENTIC EXECUTION SUMMARY")
-        print(f"{'='*60}")
-        print(f"Total iterations: {state.iterations}")
-        print(f"Goal achieved: {'✅ Yes' if state.goal_met else '❌ No'}")
-        print(f"Candidates found: {len(state.candidates)}")
-        print(f"Candidates enriched: {len(state.enriched_candidates)}")
-        print(f"Candidates ranked: {len(state.final_rankings)}")
-        print(f"Total execution time: {state.total_execution_time:.2f}s")
-        print(f"Tools used: {', '.join(set(state.tools_used))}")
-        
-        # LLM Router stats
         router_stats = self.llm_router.get_stats()
-        print(f"\n🤖 LLM Router Stats ({router_stats['model']}):")
-        print(f"   Provider: {router_stats['provider']} ({router_stats['size']})")
-        print(f"   Total calls: {router_stats['total_calls']}")
-        print(f"   Total tokens: {router_stats['total_tokens']}")
-        print(f"   Total cost: ${router_stats['total_cost']:.4f}")
-        print(f"   Avg tokens/call: {router_stats['avg_tokens_per_call']:.0f}")
-        print(f"{'='*60}\n")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "📊 AGENTIC EXECUTION SUMMARY | iterations=%d goal_achieved=%s found=%d enriched=%d ranked=%d "
+                "time=%.2fs tools=%s | router=%s (%s, %s) calls=%d tokens=%d cost=$%.4f avg_tokens/call=%.0f",
+                state.iterations, state.goal_met, len(state.candidates), len(state.enriched_candidates),
+                len(state.final_rankings), state.total_execution_time, ", ".join(set(state.tools_used)),
+                router_stats['model'], router_stats['provider'], router_stats['size'],
+                router_stats['total_calls'], router_stats['total_tokens'], router_stats['total_cost'],
+                router_stats['avg_tokens_per_call']
+            )
         
         return {
             "candidates": state.final_rankings,
-            "reasoning_log": state.execution_log,
+            "reasoning_log": [log._asdict() for log in state.execution_log],
             "goal_achieved": state.goal_met,
             "iterations": state.iterations,
             "execution_time": state.total_execution_time,
             "router_stats": router_stats,
             "architecture": "agentic"
         }
+    
+    async def _decide_with_prefetch(self, state: AgentState) -> AgentDecision:
+        """
+        Ask the router for the next action while the tool the decision rules predict
+        prefetches its inputs. The prefetch is kept if the router agrees and cancelled otherwise.
+        """
+        predicted = self._predict_next_tool(state)
+        prefetch_task = asyncio.create_task(self._safe_prefetch(self.tools[predicted], state, {})) if predicted else None
+        
+        try:
+            decision = await self.llm_router.decide_next_action(
+                state=state,
+                available_tools=[t.to_dict() for t in self.tools.values()]
+            )
+        except BaseException:
+            if prefetch_task:
+                prefetch_task.cancel()
+            raise
+        
+        if prefetch_task:
+            if predicted in decision.planned_tools():
+                logger.debug("🔮 Prefetch for %s matched the router decision", predicted)
+            else:
+                prefetch_task.cancel()
+            await asyncio.gather(prefetch_task, return_exceptions=True)
+        
+        return decision
+    
+    def _predict_next_tool(self, state: AgentState) -> Optional[str]:
+        """Likely next tool per the decision rules in the router prompt (only the ones worth prefetching)"""
+        if not state.candidates:
+            return "search_candidates"
+        if any(not c.get("github_analyzed") for c in state.candidates):
+            return "analyze_github"
+        if not state.final_rankings:
+            return "rank_candidates"
+        return None
+    
+    async def _safe_prefetch(self, tool, state: AgentState, parameters: Dict) -> None:
+        """Run a tool's prefetch; it is only an optimization, so failures are logged and ignored"""
+        try:
+            await tool.prefetch(state, parameters)
+        except Exception as e:
+            logger.debug("Prefetch for %s failed: %s", tool.name, e)
+    
+    async def _execute_tools(self, tools: List, state: AgentState, parameters: Dict) -> List[ToolResult]:
+        """
+        Run the tools picked for one iteration in order.
+        Consecutive independent enrichment tools (GitHub + personality) run concurrently;
+        anything else (search, ranking) waits for everything before it, but its prefetch
+        runs alongside the enrichment batch.
+        """
+        results = []
+        batch = []
+        for tool in tools + [None]:
+            if tool is not None and tool.name in PARALLEL_SAFE_TOOLS:
+                batch.append(tool)
+                continue
+            
+            if batch:
+                pending = [t.execute(state, parameters) for t in batch]
+                if tool is not None:
+                    pending.append(self._safe_prefetch(tool, state, parameters))
+                results.extend((await asyncio.gather(*pending))[:len(batch)])
+                batch = []
+            
+            if tool is not None:
+                results.append(await tool.execute(state, parameters))
+        
+        return results
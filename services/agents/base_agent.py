@@ -9,9 +9,10 @@ Defines core abstractions:
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, NamedTuple
 from dataclasses import dataclass, field
 from enum import Enum
+import numpy as np
 import time
 
 
@@ -25,7 +26,17 @@ class ToolName(Enum):
     FINISH = "finish"
 
 
-@dataclass
+class ExecutionLogEntry(NamedTuple):
+    """One step of the agent's execution log"""
+    iteration: int
+    tool: str
+    reasoning: str
+    success: bool
+    execution_time: float
+    timestamp: float
+
+
+@dataclass(slots=True)
 class ToolResult:
     """Result from a tool execution"""
     tool_name: str
@@ -35,22 +46,34 @@ class ToolResult:
     execution_time: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentDecision:
     """Agent's decision on next action"""
     tool_name: str
     reasoning: str
     parameters: Dict[str, Any] = field(default_factory=dict)
     confidence: float = 1.0
+    tool_names: List[str] = field(default_factory=list)  # Extra tools to run in the same iteration
+    
+    def planned_tools(self) -> List[str]:
+        """All tools to run this iteration, in order: tool_name first, then any extra tool_names"""
+        planned = [self.tool_name]
+        for name in self.tool_names:
+            if name not in planned:
+                planned.append(name)
+        return planned
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     """Current state of the agent"""
     query: str
+    query_embedding: Optional[List[float]] = None  # Filled in by the first tool that needs it
     candidates: List[Dict] = field(default_factory=list)
     enriched_candidates: List[Dict] = field(default_factory=list)
     final_rankings: List[Dict] = field(default_factory=list)
+    qualified_count: int = 0  # Candidates in final_rankings with fit_score >= min_fit_score
+    fit_scores: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float32))  # Parallel to final_rankings
     
     # Metadata
     iterations: int = 0
@@ -63,31 +86,36 @@ class AgentState:
     
     # Execution tracking
     tools_used: List[str] = field(default_factory=list)
-    execution_log: List[Dict] = field(default_factory=list)
+    execution_log: List[ExecutionLogEntry] = field(default_factory=list)
     total_execution_time: float = 0.0
     
     def add_execution_log(self, decision: AgentDecision, result: ToolResult):
         """Log an execution step"""
-        self.execution_log.append({
-            "iteration": self.iterations,
-            "tool": decision.tool_name,
-            "reasoning": decision.reasoning,
-            "success": result.success,
-            "execution_time": result.execution_time,
-            "timestamp": time.time()
-        })
-        self.tools_used.append(decision.tool_name)
+        self.execution_log.append(ExecutionLogEntry(
+            iteration=self.iterations,
+            tool=result.tool_name,
+            reasoning=decision.reasoning,
+            success=result.success,
+            execution_time=result.execution_time,
+            timestamp=time.time()
+        ))
+        self.tools_used.append(result.tool_name)
         self.total_execution_time += result.execution_time
     
+    def set_final_rankings(self, rankings: List[Dict]):
+        """Store the ranked candidates and their fit scores, counting the qualified ones once so goal checks don't rescan them"""
+        self.final_rankings = rankings
+        self.fit_scores = np.fromiter(
+            (c.get("fit_score", 0) or 0 for c in rankings), dtype=np.float32, count=len(rankings)
+        )
+        self.qualified_count = int(np.count_nonzero(self.fit_scores >= self.min_fit_score))
+    
     def check_goal(self) -> bool:
         """Check if agent's goal is achieved"""
         if not self.final_rankings:
             return False
         
-        high_quality = [c for c in self.final_rankings 
-                       if c.get("fit_score", 0) >= self.min_fit_score]
-        
-        return len(high_quality) >= self.min_candidates
+        return self.qualified_count >= self.min_candidates
     
     def should_continue(self) -> bool:
         """Decide if agent should continue iterating"""
@@ -110,6 +138,13 @@ class BaseTool(ABC):
         """Execute the tool"""
         pass
     
+    async def prefetch(self, state: AgentState, parameters: Dict) -> None:
+        """
+        Optionally warm caches / fetch inputs ahead of execute() while the router is still deciding.
+        Must not change agent state beyond caching; may be cancelled at any point. No-op by default.
+        """
+        return None
+    
     def to_dict(self) -> Dict:
         """Tool description for LLM"""
         return {
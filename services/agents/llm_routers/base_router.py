@@ -6,12 +6,22 @@ that can be used as the "brain" of the agentic system.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 from dataclasses import dataclass
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from tokenizers import Tokenizer
+import asyncio
+import functools
+import hashlib
+import io
 import time
+import numpy as np
+import re
+from .semantic_cache import SemanticCache, ranking_semantic_cache
+from .ranking_singleflight import RankingSingleFlight
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMConfig:
     """Configuration for an LLM"""
     model_name: str
@@ -20,9 +30,10 @@ class LLMConfig:
     context_window: int
     supports_json_mode: bool = False
     cost_per_1k_tokens: float = 0.0
+    tokenizer_name: Optional[str] = None  # HF Hub repo with a tokenizer.json, for token counting
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """Standardized LLM response"""
     content: str
@@ -33,6 +44,94 @@ class LLMResponse:
     cost: float = 0.0
 
 
+# First fenced block in an LLM response (closing fence optional, in case the response was cut off)
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+
+# Candidates below either of these resume-similarity cut-offs are not worth sending to the LLM ranker
+MIN_RESUME_SIMILARITY = 0.3
+PREFILTER_QUANTILE = 0.25
+
+
+class DecisionModel(BaseModel):
+    """Schema of the router's decision JSON"""
+    tool_name: str
+    reasoning: str
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    confidence: float = 1.0
+    tool_names: List[str] = Field(default_factory=list)
+
+
+# Ranking responses are a JSON array of free-form candidate evaluations
+RankedList = TypeAdapter(List[Dict[str, Any]])
+
+
+# Loaded token-counting tokenizers by HF Hub name (only successful loads are kept, so a failed download is retried)
+_tokenizers: Dict[str, Tokenizer] = {}
+# Tokenizers used by the routers created so far - loaded by warm_tokenizers() at startup
+_router_tokenizer_names: set = set()
+
+
+def load_tokenizer(tokenizer_name: str) -> Optional[Tokenizer]:
+    """
+    Load (once per process) the fast tokenizer used for token counting.
+    Blocking (a Hugging Face Hub download on first use) - call it from a worker thread.
+    """
+    tokenizer = _tokenizers.get(tokenizer_name)
+    if tokenizer is None:
+        try:
+            tokenizer = _tokenizers[tokenizer_name] = Tokenizer.from_pretrained(tokenizer_name)
+        except Exception as e:
+            print(f"⚠️ Could not load tokenizer {tokenizer_name}: {e}, falling back to word counts")
+    return tokenizer
+
+
+def warm_tokenizers():
+    """Load every router's tokenizer (startup warm-up, in a worker thread)"""
+    for tokenizer_name in list(_router_tokenizer_names):
+        load_tokenizer(tokenizer_name)
+
+
+@functools.lru_cache(maxsize=8)
+def _static_prompt_sections(tools: Tuple[Tuple[str, str], ...]) -> Tuple[str, str]:
+    """
+    The parts of the decision prompt that only depend on the available tools:
+    the tool list + decision rules, and the response format instructions.
+    """
+    tool_descriptions = "\n".join(f"- **{name}**: {description}" for name, description in tools)
+    
+    rules_section = f"""**Available Tools:**
+{tool_descriptions}
+
+**Decision Rules (STRICT ORDER - CHECK STATE CAREFULLY):**
+
+🚨 NEVER use "search_candidates" if candidates > 0 in Current State above!
+
+1. If candidates = 0 → use "search_candidates"
+2. If candidates > 0 → use "analyze_github" 
+3. If enriched_candidates > 0 → use "get_personality"
+4. If candidates > 0 AND final_rankings = 0 → use "rank_candidates" (MANDATORY!)
+5. If final_rankings > 0 AND goal achieved → use "finish"
+6. If final_rankings > 0 AND goal NOT achieved AND iterations < max → use "expand_search"
+7. If max iterations reached → use "rank_candidates" if not ranked, else "finish"
+
+**CRITICAL RULES:**
+- NEVER search again if candidates > 0
+- MUST rank before finishing
+- Check "Current State" section above for exact counts"""
+    
+    response_section = """- "analyze_github" and "get_personality" are independent: to run both in this iteration, set "tool_name" to one and add the other to an optional "tool_names" list
+
+**IMPORTANT:** Respond with ONLY a JSON object (no markdown, no explanation):
+{
+    "tool_name": "search_candidates",
+    "reasoning": "No candidates found yet, need to search",
+    "parameters": {"top_k": 10},
+    "confidence": 0.9
+}
+"""
+    return rules_section, response_section
+
+
 class BaseLLMRouter(ABC):
     """Abstract base class for LLM routers"""
     
@@ -41,6 +140,10 @@ class BaseLLMRouter(ABC):
         self.total_tokens = 0
         self.total_cost = 0.0
         self.total_calls = 0
+        if config.tokenizer_name:
+            _router_tokenizer_names.add(config.tokenizer_name)
+        # Concurrent agent runs on this router share identical in-flight ranking calls
+        self.ranking_requests = RankingSingleFlight(self._request_ranking)
     
     @abstractmethod
     async def decide_next_action(
@@ -66,6 +169,19 @@ class BaseLLMRouter(ABC):
         """
         pass
     
+    @abstractmethod
+    async def _request_ranking(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float
+    ) -> List[Dict]:
+        """
+        Send one ranking prompt to the LLM and return the parsed ranking list.
+        Called through ranking_requests.
+        """
+        pass
+    
     def _build_decision_prompt(
         self, 
         state: "AgentState", 
@@ -73,18 +189,16 @@ class BaseLLMRouter(ABC):
     ) -> str:
         """Build the reasoning prompt for decision-making"""
         
-        tool_descriptions = "\n".join([
-            f"- **{t['name']}**: {t['description']}" for t in tools
-        ])
+        rules_section, response_section = _static_prompt_sections(
+            tuple((t['name'], t['description']) for t in tools)
+        )
         
-        execution_history = "None yet (first iteration)" if not state.execution_log else "\n".join([
-            f"{i+1}. {log['tool']} - {log['reasoning']} (success: {log['success']}, time: {log['execution_time']:.2f}s)"
+        execution_history = "None yet (first iteration)" if not state.execution_log else "\n".join(
+            f"{i+1}. {log.tool} - {log.reasoning} (success: {log.success}, time: {log.execution_time:.2f}s)"
             for i, log in enumerate(state.execution_log[-3:])  # Last 3 actions
-        ])
+        )
         
-        top_fit_score = 0
-        if state.final_rankings:
-            top_fit_score = max([c.get("fit_score", 0) for c in state.final_rankings], default=0)
+        top_fit_score = float(state.fit_scores.max(initial=0.0))
         
         prompt = f"""You are an autonomous recruitment agent. Your goal is to find at least {state.min_candidates} high-quality candidates (fit_score >= {state.min_fit_score}) for this job.
 
@@ -101,37 +215,211 @@ class BaseLLMRouter(ABC):
 **Previous Actions:**
 {execution_history}
 
-**Available Tools:**
-{tool_descriptions}
-
-**Decision Rules (STRICT ORDER - CHECK STATE CAREFULLY):**
-
-🚨 NEVER use "search_candidates" if candidates > 0 in Current State above!
-
-1. If candidates = 0 → use "search_candidates"
-2. If candidates > 0 → use "analyze_github" 
-3. If enriched_candidates > 0 → use "get_personality"
-4. If candidates > 0 AND final_rankings = 0 → use "rank_candidates" (MANDATORY!)
-5. If final_rankings > 0 AND goal achieved → use "finish"
-6. If final_rankings > 0 AND goal NOT achieved AND iterations < max → use "expand_search"
-7. If max iterations reached → use "rank_candidates" if not ranked, else "finish"
-
-**CRITICAL RULES:**
-- NEVER search again if candidates > 0
-- MUST rank before finishing
-- Check "Current State" section above for exact counts
+{rules_section}
 - You ALREADY HAVE {len(state.candidates)} candidates! DO NOT SEARCH AGAIN!
-
-**IMPORTANT:** Respond with ONLY a JSON object (no markdown, no explanation):
-{{
-    "tool_name": "search_candidates",
-    "reasoning": "No candidates found yet, need to search",
-    "parameters": {{"top_k": 10}},
-    "confidence": 0.9
-}}
-"""
+{response_section}"""
         return prompt
     
+    async def _read_streamed_decision(self, deltas: AsyncIterator[str]) -> Tuple[Dict, str]:
+        """
+        Consume streamed decision text until it holds a complete, valid decision object,
+        so trailing tokens (closing fences, stray explanation) aren't waited for.
+        
+        Returns:
+            (decision dict, the JSON text it was parsed from)
+        """
+        buffer = ""
+        async for delta in deltas:
+            buffer += delta
+            
+            # Only worth trying once a closing brace has arrived after the opening one
+            start = buffer.find("{")
+            end = buffer.rfind("}")
+            if start == -1 or end < start:
+                continue
+            
+            try:
+                response_text = buffer[start:end + 1]
+                return DecisionModel.model_validate_json(response_text).model_dump(), response_text
+            except ValidationError:
+                continue  # Object not finished yet (e.g. only "parameters" has closed)
+        
+        # Stream ended without a complete object - parse whatever arrived
+        response_text = self._extract_json(buffer.strip())
+        return DecisionModel.model_validate_json(response_text).model_dump(), response_text
+    
+    async def _cached_call(
+        self,
+        cache: SemanticCache,
+        cache_text: str,
+        key_tag: str,
+        call: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Return the cached result for (cache_text, key_tag) or run `call` and cache what it returns.
+        `call` should raise on failure so errors/fallbacks never get cached.
+        The lookup and store embed cache_text (model encode + disk cache), so they run in worker threads.
+        """
+        tag = f"{self.config.model_name}:{key_tag}"
+        cached = await asyncio.to_thread(cache.check, prompt=cache_text, tag=tag)
+        if cached is not None:
+            return cached
+        
+        result = await call()
+        await asyncio.to_thread(
+            cache.store, cache_text, result, tag=tag, ttl=ttl, metadata={"model": self.config.model_name}
+        )
+        return result
+    
+    def prepare_ranking(self, query: str) -> None:
+        """
+        Warm the inputs of rank_candidates that don't depend on the candidates, so this can overlap
+        candidate enrichment: the tokenizer and the query embedding used by the ranking cache lookup.
+        Blocking - run it in a worker thread.
+        """
+        if self.config.tokenizer_name:
+            load_tokenizer(self.config.tokenizer_name)
+        ranking_semantic_cache.warm(query)
+    
+    def _decision_cache_tag(self, state: "AgentState") -> str:
+        """
+        Exact-match part of the decision cache key: the prompt inputs the decision depends on besides
+        the query (goal, state counts, top fit score, and the last action and whether it succeeded)
+        """
+        return "decide:{}:{}:{}:{}:{}:{}:{}:{}:{}".format(
+            state.min_candidates,
+            state.min_fit_score,
+            len(state.candidates),
+            len(state.enriched_candidates),
+            len(state.final_rankings),
+            float(state.fit_scores.max(initial=0.0)),
+            state.tools_used[-1] if state.tools_used else None,
+            state.execution_log[-1].success if state.execution_log else None,
+            state.iterations >= state.max_iterations
+        )
+    
+    def _ranking_cache_tag(self, candidates: List[Dict], temperature: float) -> str:
+        """Exact-match part of the ranking cache key: the candidates (and how enriched they are) in order"""
+        candidate_key = ",".join(
+            f"{c.get('student_id')}:{int(bool(c.get('github_analyzed')))}{int(bool(c.get('personality_analyzed')))}"
+            for c in candidates
+        )
+        return f"rank:{temperature}:{hashlib.sha1(candidate_key.encode()).hexdigest()}"
+    
+    def _count_tokens(self, text: str) -> int:
+        """
+        Count tokens with the model's tokenizer (word count if it isn't loaded).
+        Never loads the tokenizer itself - this runs on the event loop; warm-up / prepare_ranking load it.
+        """
+        tokenizer = _tokenizers.get(self.config.tokenizer_name) if self.config.tokenizer_name else None
+        if tokenizer is None:
+            return len(text.split())
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    
+    def _prefilter_candidates(self, candidates: List[Dict]) -> Tuple[List[Dict], np.ndarray]:
+        """
+        Drop obvious no-hires before LLM ranking: candidates below MIN_RESUME_SIMILARITY or
+        in the bottom PREFILTER_QUANTILE of resume similarity. Keeps everyone if that would drop all of them
+        (e.g. when the search path didn't provide similarity scores).
+        
+        Returns:
+            (candidates to rank, keep mask aligned with the input)
+        """
+        if not candidates:
+            return candidates, np.ones(0, dtype=bool)
+        
+        scores = np.fromiter(
+            (c.get("resume_similarity", 0.0) or 0.0 for c in candidates), dtype=np.float32, count=len(candidates)
+        )
+        keep = scores >= max(MIN_RESUME_SIMILARITY, float(np.quantile(scores, PREFILTER_QUANTILE)))
+        if not keep.any():
+            keep[:] = True
+        
+        return [c for c, k in zip(candidates, keep) if k], keep
+    
+    def _restore_prefiltered(self, rankings: List[Dict], keep: np.ndarray) -> List[Dict]:
+        """
+        Re-align LLM rankings (one per kept candidate) with the original candidate list,
+        giving pre-filtered candidates a fit_score of 0 so RankingTool's index merge still lines up.
+        """
+        restored = []
+        ranked = iter(rankings)
+        for kept in keep:
+            if kept:
+                restored.append(next(ranked, {"fit_score": 0}))
+            else:
+                restored.append({
+                    "fit_score": 0,
+                    "evaluation_bullets": ["Filtered out before LLM ranking: low resume similarity"],
+                    "next_step": "Reject"
+                })
+        return restored
+    
+    def _format_candidates(
+        self,
+        candidates: List[Dict],
+        *,
+        max_projects: int = 3,
+        max_desc: int = 100,
+        resume_preview_chars: Optional[int] = None,
+        compact_personality: bool = False
+    ) -> str:
+        """
+        Render candidates as the RAG context for rank_candidates.
+        
+        Args:
+            max_projects: GitHub projects listed per candidate
+            max_desc: characters kept from each project description
+            resume_preview_chars: truncate the resume to a preview of this length (None = full resume)
+            compact_personality: short personality line for small-context models
+        """
+        buf = io.StringIO()
+        for i, c in enumerate(candidates):
+            if i:
+                buf.write("\n\n---\n\n")
+            
+            name = c.get('name', 'Unknown')
+            github_username = c.get('github_username', 'N/A')
+            skills = c.get('skills', 'N/A')
+            similarity = c.get('resume_similarity', 0)
+            github_url = f"https://github.com/{github_username}" if github_username != "N/A" else "N/A"
+            
+            buf.write(f"{i+1}. {name} (@{github_username})\n")
+            buf.write(f"GitHub Profile: {github_url}\n")
+            buf.write(f"Skills: {skills}\n")
+            buf.write(f"Resume Match: {similarity:.2%}")
+            
+            resume_text = c.get('resume_text')
+            if resume_text:
+                if resume_preview_chars is None:
+                    buf.write(f"\n\n📄 Resume Summary:\n{resume_text}")
+                else:
+                    buf.write(f"\n\n📄 Resume: {resume_text[:resume_preview_chars]}...")
+            
+            projects = c.get('github_projects')
+            if projects:
+                buf.write("\n\n🔍 Top Projects:")
+                for proj in projects[:max_projects]:
+                    buf.write(f"\n  • {proj.get('repo_name', 'Unknown')}: {proj.get('description', '')[:max_desc]}")
+            
+            pd = c.get('personality_data')
+            if pd:
+                conscientiousness, interview_score = pd.get('conscientiousness', 0), pd.get('interview_score', 0)
+                if compact_personality:
+                    buf.write(f"\n\n🧠 Personality: C={conscientiousness:.1f}, I={interview_score:.1f}")
+                else:
+                    buf.write(f"\n\n🧠 Personality: Conscientiousness {conscientiousness:.2f}, Interview Score {interview_score:.2f}")
+        
+        return buf.getvalue()
+    
+    def _extract_json(self, text: str) -> str:
+        """Extract JSON from markdown code blocks"""
+        if "```" not in text:
+            return text
+        match = _JSON_FENCE.search(text)
+        return match.group(1) if match else text
+    
     def _calculate_cost(self, tokens: int) -> float:
         """Calculate cost based on token usage"""
         return (tokens / 1000) * self.config.cost_per_1k_tokens
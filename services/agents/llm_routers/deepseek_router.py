@@ -7,32 +7,39 @@ Frontier LLM Router using DeepSeek-V3 (671B parameters).
 - API-based (HuggingFace)
 """
 
-from typing import List, Dict
-import json
+from typing import List, Dict, Optional
 import time
-from huggingface_hub import InferenceClient
-from .base_router import BaseLLMRouter, LLMConfig, LLMResponse
+from huggingface_hub import AsyncInferenceClient
+from dotenv import load_dotenv
+from .base_router import BaseLLMRouter, LLMConfig, LLMResponse, DecisionModel, RankedList
+from .semantic_cache import decision_semantic_cache, ranking_semantic_cache
 from ..base_agent import AgentState, AgentDecision
 import os
 
+load_dotenv()
+
+# Shared across router instances so every decision/ranking call reuses the same connection pool
+async_inference_client = AsyncInferenceClient(token=os.getenv("HF_API_KEY"), timeout=60)
+
 
 class DeepSeekRouter(BaseLLMRouter):
     """
     Frontier LLM Router using DeepSeek-V3 (671B parameters)
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[AsyncInferenceClient] = None):
         config = LLMConfig(
             model_name="deepseek-ai/DeepSeek-V3-0324",
             provider="huggingface",
             size="large",  # 671B parameters
             context_window=64000,
             supports_json_mode=True,
-            cost_per_1k_tokens=0.002  # Approximate
+            cost_per_1k_tokens=0.002,  # Approximate
+            tokenizer_name="deepseek-ai/DeepSeek-V3-0324"
         )
         super().__init__(config)
         
-        self.client = InferenceClient(token=os.getenv("HF_API_KEY"))
+        self.client = client or async_inference_client
     
     async def decide_next_action(
         self, 
@@ -43,43 +50,59 @@ class DeepSeekRouter(BaseLLMRouter):
         
         prompt = self._build_decision_prompt(state, available_tools)
         
-        start_time = time.time()
-        
         try:
-            completion = self.client.chat_completion(
-                messages=[
-                    {"role": "system", "content": "You are a decision-making agent. Always respond with valid JSON only. No markdown, no explanation."},
-                    {"role": "user", "content": prompt}
-                ],
-                model=self.config.model_name,
-                temperature=0.3,  # Lower temp for more deterministic decisions
-                max_tokens=300
+            decision_json = await self._cached_call(
+                decision_semantic_cache,
+                cache_text=state.query,
+                key_tag=self._decision_cache_tag(state),
+                call=lambda: self._request_decision(prompt)
             )
             
-            latency = time.time() - start_time
-            response_text = completion.choices[0].message.content.strip()
-            
-            # Parse JSON response
-            response_text = self._extract_json(response_text)
-            decision_json = json.loads(response_text)
-            
-            # Track usage
-            self.total_calls += 1
-            tokens_used = len(prompt.split()) + len(response_text.split())  # Rough estimate
-            self.total_tokens += tokens_used
-            self.total_cost += self._calculate_cost(tokens_used)
-            
             return AgentDecision(
                 tool_name=decision_json["tool_name"],
                 reasoning=decision_json["reasoning"],
                 parameters=decision_json.get("parameters", {}),
-                confidence=decision_json.get("confidence", 1.0)
+                confidence=decision_json.get("confidence", 1.0),
+                tool_names=decision_json.get("tool_names", [])
             )
         
         except Exception as e:
             print(f"⚠️ DeepSeek decision error: {e}, using fallback")
             return self._fallback_decision(state)
     
+    async def _request_decision(self, prompt: str) -> Dict:
+        """Ask DeepSeek-V3 for the next action and return the parsed decision JSON"""
+        start_time = time.time()
+        
+        stream = await self.client.chat_completion(
+            messages=[
+                {"role": "system", "content": "You are a decision-making agent. Always respond with valid JSON only. No markdown, no explanation."},
+                {"role": "user", "content": prompt}
+            ],
+            model=self.config.model_name,
+            temperature=0.3,  # Lower temp for more deterministic decisions
+            max_tokens=300,
+            stream=True
+        )
+        
+        # Parse the decision as it streams in and stop reading once the JSON object is complete
+        deltas = (chunk.choices[0].delta.content or "" async for chunk in stream if chunk.choices)
+        try:
+            decision_json, response_text = await self._read_streamed_decision(deltas)
+        finally:
+            await deltas.aclose()
+            await stream.aclose()
+        
+        latency = time.time() - start_time
+        
+        # Track usage
+        self.total_calls += 1
+        tokens_used = self._count_tokens(prompt) + self._count_tokens(response_text)
+        self.total_tokens += tokens_used
+        self.total_cost += self._calculate_cost(tokens_used)
+        
+        return decision_json
+    
     async def rank_candidates(
         self,
         candidates: List[Dict],
@@ -88,40 +111,12 @@ class DeepSeekRouter(BaseLLMRouter):
     ) -> List[Dict]:
         """Use DeepSeek-V3 to rank candidates"""
         
-        # Build context from candidates
-        rag_context_parts = []
-        for i, c in enumerate(candidates):
-            github_username = c.get('github_username', 'N/A')
-            github_url = f"https://github.com/{github_username}" if github_username != "N/A" else "N/A"
-            
-            candidate_info = [
-                f"{i+1}. {c.get('name', 'Unknown')} (@{github_username})",
-                f"GitHub Profile: {github_url}",
-                f"Skills: {c.get('skills', 'N/A')}",
-                f"Resume Match: {c.get('resume_similarity', 0):.2%}"
-            ]
-            
-            # Add resume text if available
-            if c.get('resume_text'):
-                candidate_info.append(f"\n📄 Resume Summary:")
-                candidate_info.append(f"{c.get('resume_text', '')}") 
-            
-            # Add GitHub projects if available
-            if c.get('github_projects'):
-                candidate_info.append("\n🔍 Top Projects:")
-                for proj in c['github_projects'][:3]:
-                    candidate_info.append(
-                        f"  • {proj.get('repo_name', 'Unknown')}: {proj.get('description', '')[:100]}"
-                    )
-            
-            # Add personality if available
-            if c.get('personality_data'):
-                pd = c['personality_data']
-                candidate_info.append(f"\n🧠 Personality: Conscientiousness {pd.get('conscientiousness', 0):.2f}, Interview Score {pd.get('interview_score', 0):.2f}")
-            
-            rag_context_parts.append("\n".join(candidate_info))
+        # Only send candidates with a plausible resume match to the LLM
+        all_candidates = candidates
+        candidates, keep = self._prefilter_candidates(all_candidates)
         
-        rag_context = "\n\n---\n\n".join(rag_context_parts)
+        # Build context from candidates
+        rag_context = self._format_candidates(candidates, max_projects=3, max_desc=100)
         
         SYSTEM_PROMPT = """You are a professional recruiter. Rank candidates and provide detailed evaluations.
 
@@ -144,42 +139,42 @@ class DeepSeekRouter(BaseLLMRouter):
         USER_PROMPT = f"""Candidates:\n\n{rag_context}\n\nJob Requirements: {query}"""
         
         try:
-            completion = self.client.chat_completion(
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": USER_PROMPT}
-                ],
-                model=self.config.model_name,
-                temperature=temperature,
-                max_tokens=4000
+            rankings = await self._cached_call(
+                ranking_semantic_cache,
+                cache_text=query,
+                key_tag=self._ranking_cache_tag(candidates, temperature),
+                call=lambda: self.ranking_requests.submit(SYSTEM_PROMPT, USER_PROMPT, temperature)
             )
-            
-            response_text = completion.choices[0].message.content.strip()
-            
-            # Track usage
-            self.total_calls += 1
-            tokens_used = len(USER_PROMPT.split()) + len(response_text.split())
-            self.total_tokens += tokens_used
-            self.total_cost += self._calculate_cost(tokens_used)
-            
-            # Parse JSON and return
-            response_text = self._extract_json(response_text)
-            ranked = json.loads(response_text)
-            
-            return ranked if isinstance(ranked, list) else candidates
+            return self._restore_prefiltered(rankings, keep)
             
         except Exception as e:
             print(f"⚠️ DeepSeek ranking error: {e}")
             # Return candidates as-is with basic scores
-            return candidates
+            return all_candidates
     
-    def _extract_json(self, text: str) -> str:
-        """Extract JSON from markdown code blocks"""
-        if "```json" in text:
-            return text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            return text.split("```")[1].split("```")[0].strip()
-        return text
+    async def _request_ranking(self, system_prompt: str, user_prompt: str, temperature: float) -> List[Dict]:
+        """Ask DeepSeek-V3 to rank the candidates and return the parsed ranking list"""
+        completion = await self.client.chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            model=self.config.model_name,
+            temperature=temperature,
+            max_tokens=4000
+        )
+        
+        response_text = completion.choices[0].message.content.strip()
+        
+        # Track usage
+        self.total_calls += 1
+        tokens_used = self._count_tokens(user_prompt) + self._count_tokens(response_text)
+        self.total_tokens += tokens_used
+        self.total_cost += self._calculate_cost(tokens_used)
+        
+        # Parse JSON and return
+        response_text = self._extract_json(response_text)
+        return RankedList.validate_json(response_text)
     
     def _fallback_decision(self, state: AgentState) -> AgentDecision:
         """Rule-based fallback if LLM fails"""
@@ -8,10 +8,10 @@ Small Local LLM Router using Llama3.2:1B via Ollama.
 """
 
 from typing import List, Dict
-import json
 import time
 import ollama
-from .base_router import BaseLLMRouter, LLMConfig, LLMResponse
+from .base_router import BaseLLMRouter, LLMConfig, LLMResponse, DecisionModel, RankedList
+from .semantic_cache import decision_semantic_cache, ranking_semantic_cache
 from ..base_agent import AgentState, AgentDecision
 
 
@@ -28,10 +28,13 @@ class LlamaRouter(BaseLLMRouter):
             size="small",  # 1B parameters
             context_window=8192,
             supports_json_mode=True,
-            cost_per_1k_tokens=0.0  # Local model = free
+            cost_per_1k_tokens=0.0,  # Local model = free
+            tokenizer_name="unsloth/Llama-3.2-1B"  # Ungated mirror of the Llama 3.2 tokenizer
         )
         super().__init__(config)
         self.model_name = model_name
+        # Async client so inference waits don't block the event loop
+        self.client = ollama.AsyncClient()
     
     async def decide_next_action(
         self, 
@@ -42,53 +45,65 @@ class LlamaRouter(BaseLLMRouter):
         
         prompt = self._build_decision_prompt(state, available_tools)
         
-        start_time = time.time()
-        
         try:
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a decision-making agent. Always respond with valid JSON only. No markdown, no explanation."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                options={
-                    "temperature": 0.3,  # Lower temp for more deterministic decisions
-                    "num_predict": 300
-                },
-                format="json"  # Force JSON output
+            decision_json = await self._cached_call(
+                decision_semantic_cache,
+                cache_text=state.query,
+                key_tag=self._decision_cache_tag(state),
+                call=lambda: self._request_decision(prompt)
             )
             
-            latency = time.time() - start_time
-            response_text = response['message']['content'].strip()
-            
-            # Parse JSON response
-            response_text = self._extract_json(response_text)
-            decision_json = json.loads(response_text)
-            
-            # Track usage
-            self.total_calls += 1
-            # For local models, we still track tokens for comparison purposes
-            tokens_used = len(prompt.split()) + len(response_text.split())  # Rough estimate
-            self.total_tokens += tokens_used
-            self.total_cost += 0.0  # Local = free
-            
             return AgentDecision(
                 tool_name=decision_json["tool_name"],
                 reasoning=decision_json["reasoning"],
                 parameters=decision_json.get("parameters", {}),
-                confidence=decision_json.get("confidence", 1.0)
+                confidence=decision_json.get("confidence", 1.0),
+                tool_names=decision_json.get("tool_names", [])
             )
         
         except Exception as e:
             print(f"⚠️ Llama decision error: {e}, using fallback")
             return self._fallback_decision(state)
     
+    async def _request_decision(self, prompt: str) -> Dict:
+        """Ask Llama3.2:1B for the next action and return the parsed decision JSON"""
+        start_time = time.time()
+        
+        response = await self.client.chat(
+            model=self.model_name,
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "You are a decision-making agent. Always respond with valid JSON only. No markdown, no explanation."
+                },
+                {
+                    "role": "user", 
+                    "content": prompt
+                }
+            ],
+            options={
+                "temperature": 0.3,  # Lower temp for more deterministic decisions
+                "num_predict": 300
+            },
+            format="json"  # Force JSON output
+        )
+        
+        latency = time.time() - start_time
+        response_text = response['message']['content'].strip()
+        
+        # Parse JSON response
+        response_text = self._extract_json(response_text)
+        decision_json = DecisionModel.model_validate_json(response_text).model_dump()
+        
+        # Track usage
+        self.total_calls += 1
+        # For local models, we still track tokens for comparison purposes
+        tokens_used = self._count_tokens(prompt) + self._count_tokens(response_text)
+        self.total_tokens += tokens_used
+        self.total_cost += 0.0  # Local = free
+        
+        return decision_json
+    
     async def rank_candidates(
         self,
         candidates: List[Dict],
@@ -97,40 +112,14 @@ class LlamaRouter(BaseLLMRouter):
     ) -> List[Dict]:
         """Use Llama3.2:1B to rank candidates"""
         
-        # Build context from candidates (same as DeepSeek but for local model)
-        rag_context_parts = []
-        for i, c in enumerate(candidates):
-            github_username = c.get('github_username', 'N/A')
-            github_url = f"https://github.com/{github_username}" if github_username != "N/A" else "N/A"
-            
-            candidate_info = [
-                f"{i+1}. {c.get('name', 'Unknown')} (@{github_username})",
-                f"GitHub Profile: {github_url}",
-                f"Skills: {c.get('skills', 'N/A')}",
-                f"Resume Match: {c.get('resume_similarity', 0):.2%}"
-            ]
-            
-            # Add resume text if available (shortened for smaller model)
-            if c.get('resume_text'):
-                resume_preview = c.get('resume_text', '')[:300]  # Limit context for small model
-                candidate_info.append(f"\n📄 Resume: {resume_preview}...")
-            
-            # Add GitHub projects if available
-            if c.get('github_projects'):
-                candidate_info.append("\n🔍 Top Projects:")
-                for proj in c['github_projects'][:2]:  # Only top 2 for smaller context
-                    candidate_info.append(
-                        f"  • {proj.get('repo_name', 'Unknown')}: {proj.get('description', '')[:80]}"
-                    )
-            
-            # Add personality if available
-            if c.get('personality_data'):
-                pd = c['personality_data']
-                candidate_info.append(f"\n🧠 Personality: C={pd.get('conscientiousness', 0):.1f}, I={pd.get('interview_score', 0):.1f}")
-            
-            rag_context_parts.append("\n".join(candidate_info))
+        # Only send candidates with a plausible resume match to the LLM
+        all_candidates = candidates
+        candidates, keep = self._prefilter_candidates(all_candidates)
         
-        rag_context = "\n\n---\n\n".join(rag_context_parts)
+        # Build a shorter context for the small local model
+        rag_context = self._format_candidates(
+            candidates, max_projects=2, max_desc=80, resume_preview_chars=300, compact_personality=True
+        )
         
         # Simplified prompt for smaller model
         SYSTEM_PROMPT = """You are a recruiter. Rank candidates with:
@@ -152,45 +141,45 @@ class LlamaRouter(BaseLLMRouter):
         USER_PROMPT = f"""Candidates:\n\n{rag_context}\n\nJob: {query}"""
         
         try:
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": USER_PROMPT}
-                ],
-                options={
-                    "temperature": temperature,
-                    "num_predict": 2000
-                },
-                format="json"
+            rankings = await self._cached_call(
+                ranking_semantic_cache,
+                cache_text=query,
+                key_tag=self._ranking_cache_tag(candidates, temperature),
+                call=lambda: self.ranking_requests.submit(SYSTEM_PROMPT, USER_PROMPT, temperature)
             )
-            
-            response_text = response['message']['content'].strip()
-            
-            # Track usage
-            self.total_calls += 1
-            tokens_used = len(USER_PROMPT.split()) + len(response_text.split())
-            self.total_tokens += tokens_used
-            self.total_cost += 0.0  # Local = free
-            
-            # Parse JSON and return
-            response_text = self._extract_json(response_text)
-            ranked = json.loads(response_text)
-            
-            return ranked if isinstance(ranked, list) else candidates
+            return self._restore_prefiltered(rankings, keep)
             
         except Exception as e:
             print(f"⚠️ Llama ranking error: {e}")
             # Return candidates as-is with basic scores
-            return candidates
+            return all_candidates
     
-    def _extract_json(self, text: str) -> str:
-        """Extract JSON from markdown code blocks"""
-        if "```json" in text:
-            return text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            return text.split("```")[1].split("```")[0].strip()
-        return text
+    async def _request_ranking(self, system_prompt: str, user_prompt: str, temperature: float) -> List[Dict]:
+        """Ask Llama3.2:1B to rank the candidates and return the parsed ranking list"""
+        response = await self.client.chat(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            options={
+                "temperature": temperature,
+                "num_predict": 2000
+            },
+            format="json"
+        )
+        
+        response_text = response['message']['content'].strip()
+        
+        # Track usage
+        self.total_calls += 1
+        tokens_used = self._count_tokens(user_prompt) + self._count_tokens(response_text)
+        self.total_tokens += tokens_used
+        self.total_cost += 0.0  # Local = free
+        
+        # Parse JSON and return
+        response_text = self._extract_json(response_text)
+        return RankedList.validate_json(response_text)
     
     def _fallback_decision(self, state: AgentState) -> AgentDecision:
         """Rule-based fallback if LLM fails"""
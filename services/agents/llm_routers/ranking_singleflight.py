@@ -0,0 +1,40 @@
+"""
+Single-flight ranking requests.
+
+Concurrent agent runs that send a byte-identical ranking prompt (same candidates,
+query and temperature) share one in-flight LLM call instead of each making their own.
+Requests are dispatched immediately - nothing is held back waiting for others.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+RankingKey = Tuple[str, str, float]  # (system_prompt, user_prompt, temperature)
+
+
+class RankingSingleFlight:
+    """Deduplicates concurrent identical ranking requests for one router"""
+
+    def __init__(self, request_fn: Callable[[str, str, float], Awaitable[List[Dict]]]):
+        self._request_fn = request_fn
+        self._in_flight: Dict[RankingKey, asyncio.Future] = {}
+
+    async def submit(self, system_prompt: str, user_prompt: str, temperature: float) -> List[Dict]:
+        """Run the ranking request, or join an identical one that is already running"""
+        key = (system_prompt, user_prompt, temperature)
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._request_fn(*key))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done, key=key: self._finish(key, done))
+
+        # Shielded, so one caller being cancelled doesn't cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _finish(self, key: RankingKey, future: asyncio.Future):
+        """Forget a completed request (the next identical prompt makes a fresh call)"""
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,12 @@
+"""
+Semantic caches for LLM router calls (see services/llm_cache.py for how matching works).
+"""
+
+from services.llm_cache import SemanticCache
+
+
+# Decisions must match the state slice exactly (via the tag), so only the query is compared semantically
+decision_semantic_cache = SemanticCache(name="agent_decisions", distance_threshold=0.1, ttl=3600)
+
+# Rankings are tagged with the exact candidate set, so a coarser query threshold is safe
+ranking_semantic_cache = SemanticCache(name="agent_rankings", distance_threshold=0.15, ttl=1800)
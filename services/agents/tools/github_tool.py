@@ -6,11 +6,30 @@ Analyzes candidates' GitHub portfolios to assess technical skills.
 
 import time
 import asyncio
-from typing import Dict
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from cachetools import TTLCache
 from ..base_agent import BaseTool, AgentState, ToolResult
 from services.vector_store import VectorStore
 from services.github.github_analysis import GitHubAnalysisService
-from services.embedder import embedder
+from .query_embedding import get_query_embedding
+
+# Dedicated pool for the tool's blocking GitHub / vector-store calls, so candidate fan-out
+# doesn't compete with everything else on the default executor
+GITHUB_IO_POOL = ThreadPoolExecutor(max_workers=64, thread_name_prefix="gh_io")
+
+
+async def run_in_github_pool(fn: Callable, *args, **kwargs):
+    """Run a blocking call on GITHUB_IO_POOL"""
+    return await asyncio.get_running_loop().run_in_executor(GITHUB_IO_POOL, functools.partial(fn, *args, **kwargs))
+
+# Portfolio summaries per (student_id, github_username, analysis_type) - shared across agent runs
+portfolio_cache = TTLCache(maxsize=1024, ttl=3600)
+# One lock per cache key so concurrent misses for the same candidate only run the analysis once. Weak values:
+# a lock lives exactly as long as some task holds or waits on it, so there is nothing to pop (or leak)
+portfolio_locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
 class GitHubAnalysisTool(BaseTool):
@@ -22,6 +41,8 @@ class GitHubAnalysisTool(BaseTool):
             description="Deep-dive into candidates' GitHub portfolios to assess technical skills, project quality, and coding activity. Enriches candidates with GitHub project data."
         )
         self.github_analyzer = GitHubAnalysisService()
+        # Caps how many candidates are analyzed at once so large candidate lists don't exhaust the thread pool
+        self._semaphore = asyncio.Semaphore(16)
     
     async def execute(self, state: AgentState, parameters: Dict) -> ToolResult:
         """Execute GitHub analysis for all candidates"""
@@ -30,7 +51,7 @@ class GitHubAnalysisTool(BaseTool):
         try:
             print(f"   🐙 Analyzing GitHub portfolios for {len(state.candidates)} candidates...")
             
-            query_embedding = embedder.generate_embedding(state.query)
+            query_embedding = await asyncio.to_thread(get_query_embedding, state)
             
             # Analyze GitHub for all candidates in parallel
             tasks = []
@@ -52,19 +73,23 @@ class GitHubAnalysisTool(BaseTool):
                         candidate["portfolio_summary"] = github_data.get("portfolio_summary")
                         candidate["github_analyzed"] = True
             
-            # Update state
-            state.enriched_candidates = [c for c in state.candidates if c.get("github_analyzed")]
+            # Update enriched candidates list (those with either GitHub or personality), so running
+            # alongside get_personality doesn't drop its candidates
+            state.enriched_candidates = [
+                c for c in state.candidates 
+                if c.get("github_analyzed") or c.get("personality_analyzed")
+            ]
             
             execution_time = time.time() - start_time
             
-            analyzed_count = len(state.enriched_candidates)
+            analyzed_count = sum(1 for c in state.candidates if c.get("github_analyzed"))
             print(f"   ✅ Analyzed {analyzed_count}/{len(state.candidates)} GitHub profiles in {execution_time:.2f}s")
             
             return ToolResult(
                 tool_name=self.name,
                 success=True,
                 data={
-                    "enriched_count": len(state.enriched_candidates),
+                    "enriched_count": analyzed_count,
                     "total_candidates": len(state.candidates)
                 },
                 execution_time=execution_time
@@ -81,6 +106,10 @@ class GitHubAnalysisTool(BaseTool):
                 execution_time=execution_time
             )
     
+    async def prefetch(self, state: AgentState, parameters: Dict) -> None:
+        """Warm the query embedding only; portfolio summaries cost an LLM call, so they wait for execute()"""
+        await asyncio.to_thread(get_query_embedding, state)
+    
     async def _analyze_candidate_github(self, candidate: Dict, query_embedding) -> Dict:
         """Analyze GitHub for a single candidate"""
         sid = candidate["student_id"]
@@ -94,15 +123,18 @@ class GitHubAnalysisTool(BaseTool):
             }
         
         try:
-            # Get relevant repos
-            github_matches = await asyncio.to_thread(
-                lambda: VectorStore.search_github_repos(
-                    query_embedding=query_embedding,
-                    student_id=sid,
-                    top_k=3,
-                    threshold=0.0
+            # Get relevant repos and the portfolio summary concurrently - they're independent
+            async with self._semaphore:
+                github_matches, portfolio_summary = await asyncio.gather(
+                    run_in_github_pool(
+                        VectorStore.search_github_repos,
+                        query_embedding=query_embedding,
+                        student_id=sid,
+                        top_k=3,
+                        threshold=0.0
+                    ),
+                    self._get_portfolio_summary(sid, github_username)
                 )
-            )
             
             # Format projects
             projects = []
@@ -117,15 +149,6 @@ class GitHubAnalysisTool(BaseTool):
                     "similarity": gh.get("similarity", 0.0)
                 })
             
-            # Get portfolio summary
-            portfolio_summary = await asyncio.to_thread(
-                lambda: self.github_analyzer.analyze_portfolio_comprehensive(
-                    student_id=sid,
-                    github_username=github_username,
-                    analysis_type="quick"
-                )
-            )
-            
             return {
                 "student_id": sid,
                 "github_projects": projects,
@@ -139,3 +162,28 @@ class GitHubAnalysisTool(BaseTool):
                 "github_projects": [],
                 "portfolio_summary": None
             }
+    
+    async def _get_portfolio_summary(self, sid: str, github_username: str) -> Optional[Dict]:
+        """Quick portfolio summary for a candidate, served from portfolio_cache when possible"""
+        key = (sid, github_username, "quick")
+        if key in portfolio_cache:
+            return portfolio_cache[key]
+        
+        lock = portfolio_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another task may have filled the cache while we waited
+            if key in portfolio_cache:
+                return portfolio_cache[key]
+            
+            portfolio_summary = await run_in_github_pool(
+                self.github_analyzer.analyze_portfolio_comprehensive,
+                student_id=sid,
+                github_username=github_username,
+                analysis_type="quick"
+            )
+            
+            # Only cache real results so failures get retried next time
+            if isinstance(portfolio_summary, dict) and portfolio_summary and not portfolio_summary.get("error"):
+                portfolio_cache[key] = portfolio_summary
+        
+        return portfolio_summary
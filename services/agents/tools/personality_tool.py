@@ -6,9 +6,28 @@ Fetches personality traits and interview performance data.
 
 import time
 import asyncio
-from typing import Dict
+from typing import Dict, List
 from ..base_agent import BaseTool, AgentState, ToolResult
 from services.supabase_client import supabase
+from services.db_pool import get_pool
+
+# Only the personality columns the agent uses (plus created_at for picking the latest row)
+PERSONALITY_COLUMNS = "student_id, created_at, extraversion, agreeableness, conscientiousness, neuroticism, openness, interview_score"
+
+# Latest analysis per student, for the direct Postgres path (scores as float8 so they match PostgREST's JSON numbers)
+LATEST_PERSONALITIES_SQL = """
+    SELECT DISTINCT ON (student_id)
+        student_id::text AS student_id,
+        extraversion::float8 AS extraversion,
+        agreeableness::float8 AS agreeableness,
+        conscientiousness::float8 AS conscientiousness,
+        neuroticism::float8 AS neuroticism,
+        openness::float8 AS openness,
+        interview_score::float8 AS interview_score
+    FROM personality_analyses
+    WHERE student_id = ANY($1::uuid[])
+    ORDER BY student_id, created_at DESC
+"""
 
 
 class PersonalityAnalysisTool(BaseTool):
@@ -27,23 +46,17 @@ class PersonalityAnalysisTool(BaseTool):
         try:
             print(f"   🧠 Fetching personality data for {len(state.candidates)} candidates...")
             
-            # Fetch personality for all candidates in parallel
-            tasks = []
-            for candidate in state.candidates:
-                if not candidate.get("personality_analyzed"):
-                    tasks.append(self._fetch_personality(candidate["student_id"]))
+            # Fetch personality for all pending candidates in one query
+            ids = [c["student_id"] for c in state.candidates if not c.get("personality_analyzed")]
             
-            if tasks:
-                personality_results = await asyncio.gather(*tasks, return_exceptions=True)
+            if ids:
+                latest = await self._fetch_latest_personalities(ids)
                 
                 # Merge personality data back INTO existing candidate data (don't replace!)
-                personality_dict = {p["student_id"]: p for p in personality_results if isinstance(p, dict)}
-                
                 for candidate in state.candidates:
                     sid = candidate["student_id"]
-                    if sid in personality_dict:
-                        # UPDATE existing candidate dict (don't replace!)
-                        candidate["personality_data"] = personality_dict[sid].get("data")
+                    if sid in ids:
+                        candidate["personality_data"] = latest.get(sid)
                         candidate["personality_analyzed"] = True
             
             # Update enriched candidates list (those with either GitHub or personality)
@@ -80,25 +93,27 @@ class PersonalityAnalysisTool(BaseTool):
                 execution_time=execution_time
             )
     
-    async def _fetch_personality(self, student_id: str) -> Dict:
-        """Fetch personality data for a single candidate"""
+    async def _fetch_latest_personalities(self, student_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch the latest personality analysis of each candidate, keyed by student_id"""
         try:
+            pool = await get_pool()
+            if pool is not None:
+                rows = await pool.fetch(LATEST_PERSONALITIES_SQL, student_ids)
+                return {r["student_id"]: dict(r) for r in rows}
+            
             personality_resp = await asyncio.to_thread(
                 lambda: supabase.table("personality_analyses")
-                    .select("*")
-                    .eq("student_id", student_id)
+                    .select(PERSONALITY_COLUMNS)
+                    .in_("student_id", student_ids)
                     .order("created_at", desc=True)
                     .execute()
             )
-            
-            return {
-                "student_id": student_id,
-                "data": personality_resp.data[0] if personality_resp.data else None
-            }
-        
         except Exception as e:
-            print(f"      ⚠️ Personality fetch error for {student_id}: {e}")
-            return {
-                "student_id": student_id,
-                "data": None
-            }
+            print(f"      ⚠️ Personality fetch error for {len(student_ids)} candidates: {e}")
+            return {}
+        
+        # Rows are newest first, so the first row seen per student is the latest
+        latest = {}
+        for row in personality_resp.data:
+            latest.setdefault(row["student_id"], row)
+        return latest
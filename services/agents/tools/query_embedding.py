@@ -0,0 +1,17 @@
+"""
+Query embedding helper shared by the agent tools.
+
+The job query doesn't change during a run, so it's embedded once and kept on the
+AgentState; identical queries across runs hit the embedder's LRU cache.
+"""
+
+from typing import List
+from ..base_agent import AgentState
+from services.embedder import embedder
+
+
+def get_query_embedding(state: AgentState) -> List[float]:
+    """Embedding of state.query, computed on first use and reused for the rest of the run"""
+    if state.query_embedding is None:
+        state.query_embedding = embedder.generate_embedding(state.query)
+    return state.query_embedding
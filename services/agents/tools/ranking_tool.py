@@ -5,9 +5,22 @@ Uses LLM to rank and evaluate candidates holistically.
 """
 
 import time
+import asyncio
+from operator import itemgetter
 from typing import Dict
 from ..base_agent import BaseTool, AgentState, ToolResult
 
+# Ranking fields merged from the LLM's evaluation into each candidate, with defaults for missing ones
+RANKING_DEFAULTS = {
+    "fit_score": 5,
+    "evaluation_bullets": (),
+    "notable_github_projects": (),
+    "next_step": "Review",
+    "personality_insight": ""
+}
+RANKING_FIELDS = tuple(RANKING_DEFAULTS)
+_get_ranking_fields = itemgetter(*RANKING_FIELDS)
+
 
 class RankingTool(BaseTool):
     """Tool for ranking candidates using LLM"""
@@ -19,6 +32,10 @@ class RankingTool(BaseTool):
         )
         self.llm_router = llm_router
     
+    async def prefetch(self, state: AgentState, parameters: Dict) -> None:
+        """Prepare the candidate-independent parts of ranking (tokenizer, query embedding for the cache lookup)"""
+        await asyncio.to_thread(self.llm_router.prepare_ranking, state.query)
+    
     async def execute(self, state: AgentState, parameters: Dict) -> ToolResult:
         """Execute LLM ranking"""
         start_time = time.time()
@@ -35,32 +52,20 @@ class RankingTool(BaseTool):
                 temperature=temperature
             )
             
-            # The LLM only returns ranking info, we need to preserve original fields like name, student_id, etc.
-            ranked_candidates = []
-            for i, original_candidate in enumerate(state.candidates):
-                # Start with the original candidate data (has name, student_id, etc.)
-                merged = original_candidate.copy()
-                
-                # Find matching ranking from LLM (match by index or student_id)
-                if i < len(llm_rankings):
-                    llm_ranking = llm_rankings[i]
-                    # Merge in the ranking-specific fields from LLM
-                    merged["fit_score"] = llm_ranking.get("fit_score", 5)
-                    merged["evaluation_bullets"] = llm_ranking.get("evaluation_bullets", [])
-                    merged["notable_github_projects"] = llm_ranking.get("notable_github_projects", [])
-                    merged["next_step"] = llm_ranking.get("next_step", "Review")
-                    merged["personality_insight"] = llm_ranking.get("personality_insight", "")
-                
-                ranked_candidates.append(merged)
+            # The LLM only returns ranking info, so overlay its fields onto the original candidates (name, student_id, etc.).
+            # Rankings line up with candidates by index. The candidate dicts are updated in place instead of copied:
+            # from here on state.candidates and final_rankings share them, and later enrichment shows up in both.
+            for candidate, llm_ranking in zip(state.candidates, llm_rankings):
+                candidate.update(zip(RANKING_FIELDS, _get_ranking_fields({**RANKING_DEFAULTS, **llm_ranking})))
+            ranked_candidates = list(state.candidates)
             
             # Update state
-            state.final_rankings = ranked_candidates
+            state.set_final_rankings(ranked_candidates)
             state.goal_met = state.check_goal()
             
             execution_time = time.time() - start_time
             
-            high_quality = [c for c in ranked_candidates if c.get("fit_score", 0) >= state.min_fit_score]
-            print(f"   ✅ Ranked {len(ranked_candidates)} candidates ({len(high_quality)} high-quality) in {execution_time:.2f}s")
+            print(f"   ✅ Ranked {len(ranked_candidates)} candidates ({state.qualified_count} high-quality) in {execution_time:.2f}s")
             
             return ToolResult(
                 tool_name=self.name,
@@ -68,7 +73,7 @@ class RankingTool(BaseTool):
                 data={
                     "ranked_candidates": ranked_candidates,
                     "count": len(ranked_candidates),
-                    "high_quality_count": len(high_quality)
+                    "high_quality_count": state.qualified_count
                 },
                 execution_time=execution_time
             )
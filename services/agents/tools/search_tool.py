@@ -5,14 +5,26 @@ RAG-based candidate search using resume embeddings.
 """
 
 import time
-from typing import Dict
+import asyncio
+import logging
+from typing import Dict, List
 from ..base_agent import BaseTool, AgentState, ToolResult
-from services.embedder import embedder
+from .query_embedding import get_query_embedding
 from services.vector_store import VectorStore
-from services.rag_factory import RAGFactory
+from services.rag_factory import rag_factory
 from services.supabase_client import supabase
+from services.db_pool import get_pool
 from config.feature_flags import feature_flags
 
+# Resume characters kept per candidate (match_candidates_enriched truncates to the same length in SQL)
+RESUME_PREVIEW_CHARS = 500
+
+# Only the profile columns the agent uses
+PROFILE_COLUMNS = "id, name, skills, github_username"
+PROFILES_BY_ID_SQL = "SELECT id::text AS id, name, skills, github_username FROM profiles WHERE id = ANY($1::uuid[])"
+
+logger = logging.getLogger(__name__)
+
 
 class SearchCandidatesTool(BaseTool):
     """Tool for searching candidates using RAG"""
@@ -23,6 +35,11 @@ class SearchCandidatesTool(BaseTool):
             description="Search for candidates matching job requirements using semantic search (RAG). Returns up to 10 candidates with resume similarity scores."
         )
     
+    async def prefetch(self, state: AgentState, parameters: Dict) -> None:
+        """Warm the query embedding used by the basic vector search"""
+        if not (feature_flags.ENABLE_CUSTOM_RAG or feature_flags.ENABLE_GRAPH_RAG):
+            await asyncio.to_thread(get_query_embedding, state)
+    
     async def execute(self, state: AgentState, parameters: Dict) -> ToolResult:
         """Execute RAG search"""
         start_time = time.time()
@@ -33,15 +50,27 @@ class SearchCandidatesTool(BaseTool):
             
             # Use RAG factory or basic vector search
             if feature_flags.ENABLE_CUSTOM_RAG or feature_flags.ENABLE_GRAPH_RAG:
-                rag_factory = RAGFactory()
-                matches = rag_factory.search_candidates(
-                    query_text=state.query,
-                )
+                # Custom RAG reranks on the async Cohere client; Graph RAG runs in a worker thread
+                matches = await rag_factory.search_candidates_async(query_text=state.query)
+                
+                # RAG results carry full resumes
+                truncate_resumes = True
+                
+                # Deduplicate, then fetch every profile in one round trip
+                sids = list(dict.fromkeys(m.get("student_id") for m in matches))
+                profiles = await self._fetch_profiles(sids) if sids else {}
             else:
-                query_embedding = embedder.generate_embedding(state.query)
-                matches = VectorStore.search_similar_resumes(
+                # Model encode and PostgREST call are both blocking - keep them off the event loop
+                query_embedding = await asyncio.to_thread(get_query_embedding, state)
+                matches = await asyncio.to_thread(
+                    VectorStore.search_candidates_enriched,
                     query_embedding=query_embedding,
                 )
+                
+                # Profile fields and the latest personality analysis are joined onto each match,
+                # and resume_text is already cut to RESUME_PREVIEW_CHARS, by the search itself
+                truncate_resumes = False
+                profiles = {m["student_id"]: m for m in matches}
             
             # Enrich with basic profile data
             enriched_matches = []
@@ -55,32 +84,33 @@ class SearchCandidatesTool(BaseTool):
                     continue
                 seen_students.add(sid)
                 
-                profile_resp = supabase.table("profiles").select("*").eq("id", sid).execute()
+                profile = profiles.get(sid)
                 
-                if profile_resp.data:
-                    profile = profile_resp.data[0]
+                if profile:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Profile fields for %s: %s (name=%r)", sid[:8], list(profile.keys()), profile.get("name"))
                     
-                    # Debug: print available fields
-                    print(f"      🔍 Profile fields for {sid[:8]}: {list(profile.keys())}")
-                    print(f"      📋 Name field value: {profile.get('name')}")
+                    name = profile.get("name") or f"Student {sid[:8]}"  # Fallback to student ID prefix
                     
-                    # Try different possible name fields
-                    name = (
-                        profile.get("name") or 
-                        profile.get("full_name") or 
-                        profile.get("student_name") or
-                        profile.get("display_name") or
-                        f"Student {sid[:8]}"  # Fallback to student ID prefix
-                    )
+                    resume_text = m.get("resume_text") or ""
+                    if truncate_resumes:
+                        resume_text = resume_text[:RESUME_PREVIEW_CHARS]
                     
-                    enriched_matches.append({
+                    candidate = {
                         "student_id": sid,
                         "name": name,
                         "skills": profile.get("skills", "N/A"),
                         "github_username": profile.get("github_username", "N/A"),
                         "resume_similarity": m.get("similarity", 0.0),
-                        "resume_text": m.get("resume_text", "")[:500]
-                    })
+                        "resume_text": resume_text
+                    }
+                    
+                    # Pre-joined personality data - get_personality has nothing left to fetch for this candidate
+                    if "personality_data" in m:
+                        candidate["personality_data"] = m["personality_data"]
+                        candidate["personality_analyzed"] = True
+                    
+                    enriched_matches.append(candidate)
             
             # Update state
             state.candidates = enriched_matches
@@ -109,3 +139,15 @@ class SearchCandidatesTool(BaseTool):
                 error=str(e),
                 execution_time=execution_time
             )
+    
+    async def _fetch_profiles(self, sids: List[str]) -> Dict[str, Dict]:
+        """Fetch profiles keyed by id - straight from Postgres when the pool is configured, else via PostgREST"""
+        pool = await get_pool()
+        if pool is not None:
+            rows = await pool.fetch(PROFILES_BY_ID_SQL, sids)
+            return {r["id"]: dict(r) for r in rows}
+        
+        profile_resp = await asyncio.to_thread(
+            lambda: supabase.table("profiles").select(PROFILE_COLUMNS).in_("id", sids).execute()
+        )
+        return {p["id"]: p for p in profile_resp.data}
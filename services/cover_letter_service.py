@@ -1,32 +1,24 @@
 # services/cover_letter_service.py
 from services.supabase_client import supabase
 from services.llm_client import llm_client
-from typing import List, Dict
+from services.db_pool import get_pool
+from services.llm_cache import llm_response_cache, ExactResponseCache
+from typing import List, Dict, Iterator
+import asyncio
 
-class coverLetterService:
-    @staticmethod
-    def generate_resume_feedback(resume_text: str) -> str:
-        system_prompt = """
+# Job columns used for cover letters
+JOB_COLUMNS = "id, title, description"
+JOBS_BY_ID_SQL = "SELECT id::text AS id, title, description FROM jobs WHERE id = ANY($1::uuid[])"
+
+RESUME_FEEDBACK_PROMPT = """
         You are a world-class career coach providing feedback on a student's resume. 
         Your tone is encouraging but direct. Identify 3 strengths and 3 areas for 
         improvement, providing specific, actionable advice for each. Format your 
         response in clear markdown sections. Keep your response short and concise.
         """
-        
-        feedback = llm_client.generate_text(system_prompt, resume_text)
-        return feedback
-    
-    @staticmethod
-    def generate_cover_letter_for_job(job_description: str, relevant_experience_chunks: List[str], student_profile: Dict) -> str:
-        """
-        Generates a tailored cover letter using a JD and relevant resume snippets.
-        """
-        print("LLM Service: Generating cover letter...")
 
-        context = "\n- ".join(relevant_experience_chunks)
-        student_name = student_profile.get("name", "[Your Name]")
-        
-        system_prompt = f"""
+# Prompt templates - filled with str.format, so only the per-request values are substituted on each call
+COVER_LETTER_SYSTEM_PROMPT = """
         You are a professional career writer crafting a compelling, concise, and professional cover letter for a student. 
         Your task is to generate ONLY the body of the cover letter.
         - Do NOT include student's address, date, or the hiring manager's address).
@@ -36,8 +28,8 @@ class coverLetterService:
         - You MUST seamlessly weave the candidate's most relevant experiences into a narrative. 
         - Do not just list their skills; connect them to the job's requirements and tell a story.
         """
-        
-        user_prompt = f"""
+
+COVER_LETTER_USER_PROMPT = """
         Here is the job description the student is applying for:
         --- JOB DESCRIPTION ---
         {job_description}
@@ -51,26 +43,136 @@ class coverLetterService:
         Now, write the cover letter.
         """
 
-        cover_letter = llm_client.generate_text(system_prompt, user_prompt)
-        return cover_letter
+REFINE_SYSTEM_PROMPT = """
+        You are an AI writing assistant. Your task is to rewrite and improve an existing cover letter based on the user's specific instruction.
+        - You MUST return ONLY the full, rewritten cover letter body.
+        - Do NOT add headers, addresses, or any text other than the refined letter.
+        - Adhere strictly to the user's instruction (e.g., 'make it more formal,' 'shorten it,' 'focus more on my Python skills').
+        """
+
+REFINE_USER_PROMPT = """
+        <OriginalCoverLetter>
+        {original_letter}
+        </OriginalCoverLetter>
+
+        <UserInstruction>
+        {user_instruction}
+        </UserInstruction>
+
+        Now, please provide the complete, rewritten cover letter body based on the instruction.
+        """
+
+def _is_llm_error(text: str) -> bool:
+    """llm_client reports failures as an 'Error: ...' response - never cache those"""
+    return text.startswith("Error: ")
+
+def cached_generate_text(system_prompt: str, user_prompt: str) -> str:
+    """llm_client.generate_text, served from llm_response_cache for a prompt seen before"""
+    key = ExactResponseCache.key(system_prompt, user_prompt)
+    text = llm_response_cache.get(key)
+    if text is None:
+        text = llm_client.generate_text(system_prompt, user_prompt)
+        if not _is_llm_error(text):
+            llm_response_cache.set(key, text)
+    return text
+
+def cached_generate_text_stream(system_prompt: str, user_prompt: str) -> Iterator[str]:
+    """
+    llm_client.generate_text_stream backed by llm_response_cache: a cached response is
+    yielded as a single chunk, and a completed stream is cached for next time.
+    """
+    key = ExactResponseCache.key(system_prompt, user_prompt)
+    cached = llm_response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    
+    chunks = []
+    for chunk in llm_client.generate_text_stream(system_prompt, user_prompt):
+        chunks.append(chunk)
+        yield chunk
+    
+    if chunks and not _is_llm_error(chunks[-1]):
+        llm_response_cache.set(key, "".join(chunks))
+
+class coverLetterService:
+    @staticmethod
+    def generate_resume_feedback(resume_text: str) -> str:
+        feedback = cached_generate_text(RESUME_FEEDBACK_PROMPT, resume_text)
+        return feedback
+    
+    @staticmethod
+    def stream_resume_feedback(resume_text: str) -> Iterator[str]:
+        """
+        Same as generate_resume_feedback but yields the feedback in chunks as the LLM generates it.
+        Cached feedback is yielded as a single chunk.
+        """
+        return cached_generate_text_stream(RESUME_FEEDBACK_PROMPT, resume_text)
+    
+    @staticmethod
+    def _cover_letter_prompts(job_description: str, relevant_experience_chunks: List[str], student_profile: Dict):
+        """Builds the (system_prompt, user_prompt) for a cover letter"""
+        context = "\n- ".join(relevant_experience_chunks)
+        student_name = student_profile.get("name", "[Your Name]")
+        
+        system_prompt = COVER_LETTER_SYSTEM_PROMPT.format(student_name=student_name)
+        user_prompt = COVER_LETTER_USER_PROMPT.format(job_description=job_description, context=context)
+        return system_prompt, user_prompt
+    
+    @staticmethod
+    def generate_cover_letter_for_job(job_description: str, relevant_experience_chunks: List[str], student_profile: Dict) -> str:
+        """
+        Generates a tailored cover letter using a JD and relevant resume snippets.
+        """
+        print("LLM Service: Generating cover letter...")
+
+        system_prompt, user_prompt = coverLetterService._cover_letter_prompts(
+            job_description, relevant_experience_chunks, student_profile
+        )
+        # Exact prompt match only - similar job descriptions (same employer boilerplate, same template)
+        # still need their own letter
+        return cached_generate_text(system_prompt, user_prompt)
+    
+    @staticmethod
+    def stream_cover_letter_for_job(job_description: str, relevant_experience_chunks: List[str], student_profile: Dict) -> Iterator[str]:
+        """
+        Same as generate_cover_letter_for_job but yields the letter in chunks as the LLM generates it.
+        """
+        system_prompt, user_prompt = coverLetterService._cover_letter_prompts(
+            job_description, relevant_experience_chunks, student_profile
+        )
+        return cached_generate_text_stream(system_prompt, user_prompt)
     
     @staticmethod
-    def get_jds_by_ids(ids: List[str]) -> List[Dict]:
+    async def get_jds_by_ids(ids: List[str]) -> List[Dict]:
         """
         Retrieves multiple job posting records from the database
-        based on a list of their IDs.
+        based on a list of their IDs (only the columns cover letters use).
         """
-        try:            
-            response = supabase.table("jobs")\
-                .select("*")\
-                .in_("id", ids)\
-                .execute()
+        try:
+            pool = await get_pool()
+            if pool is not None:
+                rows = await pool.fetch(JOBS_BY_ID_SQL, ids)
+                return [dict(row) for row in rows]
             
+            response = await asyncio.to_thread(
+                lambda: supabase.table("jobs")
+                    .select(JOB_COLUMNS)
+                    .in_("id", ids)
+                    .execute()
+            )
             return response.data
         except Exception as e:
             print(f"Error fetching job postings: {e}")
             return []
         
+    @staticmethod
+    def _refine_prompts(original_letter: str, user_instruction: str):
+        """Builds the (system_prompt, user_prompt) for refining a cover letter"""
+        system_prompt = REFINE_SYSTEM_PROMPT
+        user_prompt = REFINE_USER_PROMPT.format(original_letter=original_letter, user_instruction=user_instruction)
+        return system_prompt, user_prompt
+    
     @staticmethod
     def refine_cover_letter(original_letter: str, user_instruction: str) -> str:
         """
@@ -78,24 +180,14 @@ class coverLetterService:
         """
         print("LLM Service: Refining cover letter...")
         
-        system_prompt = """
-        You are an AI writing assistant. Your task is to rewrite and improve an existing cover letter based on the user's specific instruction.
-        - You MUST return ONLY the full, rewritten cover letter body.
-        - Do NOT add headers, addresses, or any text other than the refined letter.
-        - Adhere strictly to the user's instruction (e.g., 'make it more formal,' 'shorten it,' 'focus more on my Python skills').
+        system_prompt, user_prompt = coverLetterService._refine_prompts(original_letter, user_instruction)
+        refined_letter = cached_generate_text(system_prompt, user_prompt)
+        return refined_letter
+    
+    @staticmethod
+    def stream_refine_cover_letter(original_letter: str, user_instruction: str) -> Iterator[str]:
         """
-        
-        user_prompt = f"""
-        <OriginalCoverLetter>
-        {original_letter}
-        </OriginalCoverLetter>
-
-        <UserInstruction>
-        {user_instruction}
-        </UserInstruction>
-
-        Now, please provide the complete, rewritten cover letter body based on the instruction.
+        Same as refine_cover_letter but yields the refined letter in chunks as the LLM generates it.
         """
-
-        refined_letter = llm_client.generate_text(system_prompt, user_prompt)
-        return refined_letter
\ No newline at end of file
+        system_prompt, user_prompt = coverLetterService._refine_prompts(original_letter, user_instruction)
+        return cached_generate_text_stream(system_prompt, user_prompt)
\ No newline at end of file
@@ -5,27 +5,141 @@ from services.vector_store import VectorStore
 from services.embedding_service import *
 from services.llama_wrappers import custom_llm, custom_embed_model, local_llm_client
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from services.embedder import embedder
+from utils.topk import top_k_indices
+from cachetools import TTLCache
+import asyncio
+import hashlib
 import json
 import logging
 import cohere
+import httpx
+import numpy as np
 import os
+import threading
+import time
 
 load_dotenv()
 
 api_key = os.getenv("COHERE_API_KEY")
-co = cohere.Client(api_key)
+
+COHERE_API_BASE_URL = "https://api.cohere.com"
+COHERE_RERANK_URL = f"{COHERE_API_BASE_URL}/v1/rerank"
+RERANK_MODEL = "rerank-english-v3.0"
+# ~500 tokens per document: enough for the reranker's relevance signal, and rerank cost/latency scale with tokens
+MAX_RERANK_CHARS = 2000
+
+# Fetches the likely winners' full resumes while the sync rerank call is in flight
+HYDRATION_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag_hydrate")
+
+# Shared SDK client (and its connection pool) for sync rerank calls, created on first use
+_cohere_client: Optional[cohere.Client] = None
+_cohere_client_lock = threading.Lock()
+
+# Shared async client for rerank calls - HTTP/2 lets concurrent reranks multiplex over one connection
+_async_cohere_client: Optional[httpx.AsyncClient] = None
+
+# Rerank doc types, as stored in _build_rerank_inputs' doc_types column
+DOC_TYPE_RESUME = 0
+DOC_TYPE_GITHUB = 1
+
+# What a result's combined_score sums (reported per result as "score_source"): Cohere relevance
+# scores, or - when every retrieved student makes the cut and the rerank is skipped - the
+# retrieval's cosine similarities. The two scales aren't comparable.
+SCORE_SOURCE_RERANK = "rerank"
+SCORE_SOURCE_SIMILARITY = "similarity"
+
+# Rerank results by (model, query, documents) - the scores are deterministic for the same inputs,
+# so repeated queries (eval runs, retries) skip the paid Cohere call
+_rerank_cache = TTLCache(maxsize=512, ttl=3600)
+_rerank_cache_lock = threading.Lock()
 
 logger = logging.getLogger(__name__)
 
+
+def get_cohere_client() -> cohere.Client:
+    """Lazily create the shared Cohere SDK client"""
+    global _cohere_client
+    if _cohere_client is None:
+        with _cohere_client_lock:
+            if _cohere_client is None:
+                _cohere_client = cohere.Client(api_key)
+    return _cohere_client
+
+
+def get_async_cohere_client() -> httpx.AsyncClient:
+    """Lazily create the shared async Cohere HTTP client"""
+    global _async_cohere_client
+    if _async_cohere_client is None or _async_cohere_client.is_closed:
+        _async_cohere_client = httpx.AsyncClient(
+            http2=True,
+            timeout=30,
+            headers={"Authorization": f"Bearer {api_key}"}
+        )
+    return _async_cohere_client
+
+
+async def warm_async_cohere_client():
+    """
+    Open the shared async client's HTTP/2 connection (DNS, TCP, TLS) with an unbilled HEAD
+    request, so the first rerank doesn't pay the set-up. Any response status will do.
+    """
+    await get_async_cohere_client().head(COHERE_API_BASE_URL)
+
+
+def _rerank_cache_key(query_text: str, documents: List[str]) -> str:
+    """Content hash of a rerank request (model, query and the ordered documents)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (RERANK_MODEL, query_text, *documents):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _dedupe_documents(documents: List[str]) -> Tuple[List[str], List[List[int]]]:
+    """
+    Distinct documents (first-seen order) and, for each, the positions it occupies in `documents` -
+    the same resume text or chunk retrieved twice is only sent (and billed) once
+    """
+    position_lists: Dict[str, List[int]] = {}
+    for i, doc in enumerate(documents):
+        position_lists.setdefault(doc, []).append(i)
+    return list(position_lists), list(position_lists.values())
+
+
+def _expand_rerank_results(unique_results, positions: List[List[int]]) -> List[Tuple[int, float]]:
+    """Map (unique index, score) rerank results back to every original document position"""
+    return [(i, score) for unique_index, score in unique_results for i in positions[unique_index]]
+
+
+def _get_cached_rerank(key: str) -> Optional[List[Tuple[int, float]]]:
+    with _rerank_cache_lock:
+        cached = _rerank_cache.get(key)
+    return list(cached) if cached is not None else None
+
+
+def _set_cached_rerank(key: str, rerank_results: List[Tuple[int, float]]):
+    with _rerank_cache_lock:
+        _rerank_cache[key] = tuple(rerank_results)
+
+
+async def close_async_cohere_client():
+    """Close the shared async Cohere HTTP client (e.g. at the end of an eval run)"""
+    global _async_cohere_client
+    if _async_cohere_client is not None:
+        await _async_cohere_client.aclose()
+        _async_cohere_client = None
+
+
 class CustomRAGService:
 
     @staticmethod
     def query_custom_rag(
         query_text: str,
         top_k: int = 3,  # No. of candidates
-        filters: Optional[Dict] = None, 
+        filters: Optional[Dict] = None,
         threshold: float = 0.3
     ) -> List[Dict]:
         """
@@ -36,109 +150,340 @@ class CustomRAGService:
         logger.info(f"Ranking top {top_k} candidates.")
 
         try:
-            # --- Embed the Query ---
-            query_embedding = embedder.generate_embedding(query_text)
-            print("query embedding length:", len(query_embedding))  # should be 384
-
-            # --- Retrieve Relevant Resumes ---
-            logger.info("Searching resumes globally using search_similar_resumes...")
-            retrieved_resumes = VectorStore.search_similar_resumes(
-                query_embedding=query_embedding,
-                top_k=top_k*5,  # retrieve more to give reranker options
-                threshold=threshold
-            )
-            
-            # --- Retrieve Relevant Github Profiles ---
-            logger.info(f"Searching GitHub Profiles...")
-            retrieved_githubs = VectorStore.search_similar_github_profiles(
-                query_embedding=query_embedding,
-                top_k=top_k*5,
-                threshold=threshold
-            )
+            retrieved_resumes, retrieved_githubs = CustomRAGService._retrieve(query_text, top_k, threshold)
 
             # If no data found
             if not retrieved_resumes and not retrieved_githubs:
                 logger.warning("No relevant documents found.")
                 return []
-            
-            # Prepare combined docs for reranking
-            combined_docs = []
-            id_map = []
-
-            for r in retrieved_resumes:
-                combined_docs.append(r["resume_text"])
-                id_map.append({"student_id": r.get("student_id"), "type": "resume"})
-
-            for g in retrieved_githubs:
-                combined_docs.append(g["chunk_text"])
-                id_map.append({"student_id": g.get("student_id"), "type": "github"})
-
-            # --- Call Cohere reranker ---
-            response = co.rerank(
-                model="rerank-english-v3.0",
-                query=query_text,
-                documents=combined_docs
+
+            combined_docs, doc_student_ids, _ = CustomRAGService._build_rerank_inputs(retrieved_resumes, retrieved_githubs)
+
+            # --- Call Cohere reranker (unless every retrieved student makes the cut anyway) ---
+            prefetched = None
+            score_source = SCORE_SOURCE_RERANK
+            if len(combined_docs) <= top_k:
+                rerank_results = CustomRAGService._similarity_results(retrieved_resumes, retrieved_githubs)
+                score_source = SCORE_SOURCE_SIMILARITY
+            else:
+                # Speculatively fetch the full resumes of the best vector matches while the rerank runs
+                prefetch_future = HYDRATION_POOL.submit(
+                    CustomRAGService._fetch_resume_texts,
+                    CustomRAGService._likely_top_student_ids(retrieved_resumes, top_k)
+                )
+                rerank_results = CustomRAGService.rerank(query_text, combined_docs)
+                prefetched = prefetch_future.result()
+
+            top_results = CustomRAGService._merge_rerank_results(
+                rerank_results, doc_student_ids, retrieved_resumes, retrieved_githubs, top_k, score_source
             )
+            return CustomRAGService._hydrate_resume_texts(top_results, prefetched)
 
-            # --- Combine rerank results ---
-            ranked_entries = []
-            
-            for r in response.results:
-                original_index = r.index
-                original_doc = id_map[original_index] # Get the original doc using the correct index
-                
-                ranked_entries.append({
-                    "student_id": original_doc.get("student_id"),
-                    "type": original_doc.get("type"),
-                    "rerank_score": r.relevance_score
-                })
+        except Exception as e:
+            logger.error(f"Custom RAG query failed: {str(e)}", exc_info=True)
+            return []
+
+    @staticmethod
+    async def query_custom_rag_async(
+        query_text: str,
+        top_k: int = 3,  # No. of candidates
+        filters: Optional[Dict] = None,
+        threshold: float = 0.3
+    ) -> List[Dict]:
+        """
+        Async version of query_custom_rag.
+        Retrieval runs in a worker thread and the rerank goes straight to Cohere's REST API
+        on the shared HTTP/2 client, so concurrent queries don't block each other.
+        """
+        logger.info(f"Received async Custom RAG query (full resumes): {query_text[:100]}...")
+
+        try:
+            query_embedding = await asyncio.to_thread(embedder.generate_embedding, query_text)
+            results, _ = await CustomRAGService._query_with_embedding_async(query_text, query_embedding, top_k, threshold)
+            return results
+
+        except Exception as e:
+            logger.error(f"Async Custom RAG query failed: {str(e)}", exc_info=True)
+            return []
+
+    @staticmethod
+    async def query_custom_rag_batch(
+        queries: List[str],
+        top_k: int = 3,  # No. of candidates
+        threshold: float = 0.3,
+        max_concurrency: int = 4
+    ) -> List[Tuple[List[Dict], float]]:
+        """
+        Run several Custom RAG queries (e.g. an evaluation set): all queries are embedded in one
+        batched model call, then their retrieval + rerank pipelines run at most max_concurrency at a
+        time (keeps a rate-limited Cohere key from rejecting a burst of reranks).
+        Returns one (results, seconds) pair per query, in order. The time is that query's own
+        retrieval + rerank + hydration; a failed query gives ([], nan).
+        """
+        logger.info(f"Received batch of {len(queries)} Custom RAG queries")
+
+        query_embeddings = await asyncio.to_thread(embedder.generate_query_embeddings, queries)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(query_text: str, query_embedding: List[float]) -> Tuple[List[Dict], float]:
+            async with semaphore:
+                return await CustomRAGService._query_with_embedding_async(query_text, query_embedding, top_k, threshold)
+
+        outputs = await asyncio.gather(
+            *(run(query_text, query_embedding) for query_text, query_embedding in zip(queries, query_embeddings)),
+            return_exceptions=True
+        )
+
+        for query_text, output in zip(queries, outputs):
+            if isinstance(output, Exception):
+                logger.error(f"Batched Custom RAG query failed ({query_text[:50]}): {str(output)}")
+        return [([], float("nan")) if isinstance(output, Exception) else output for output in outputs]
 
-            # --- Merge scores per student  ---
-            merged_candidates = {}
-            for item in ranked_entries:
-                sid = item["student_id"]
-                if not sid: continue
-
-                if sid not in merged_candidates:
-                    # New candidate. We need their name and full resume text.
-                    # Let's find their original full resume record
-                    full_resume_record = next((res for res in retrieved_resumes if res.get("student_id") == sid), None)
-                    
-                    student_name = "N/A"
-                    resume_text = None
-
-                    if full_resume_record:
-                        student_name = full_resume_record.get("student_name", "N/A")
-                        resume_text = full_resume_record.get("resume_text")
-                    else:
-                        # If they only had a GitHub match, try to get name from there
-                        github_record = next((git for git in retrieved_githubs if git.get("student_id") == sid), None)
-                        if github_record:
-                            student_name = github_record.get("student_name", "N/A")
-
-                    merged_candidates[sid] = {
-                        "student_id": sid,
-                        "student_name": student_name,
-                        "resume_text": resume_text, # Only return resume text
-                        "combined_score": 0.0,
-                    }
-
-                # Add the score (from either resume or github) to the total
-                merged_candidates[sid]["combined_score"] += item["rerank_score"]
-                # merged_candidates[sid]["relevant_chunks_count"] += 1
-
-            # --- Rank by combined score ---
-            ranked_candidates = sorted(
-                merged_candidates.values(),
-                key=lambda x: x["combined_score"],
-                reverse=True
+    @staticmethod
+    async def _query_with_embedding_async(
+        query_text: str,
+        query_embedding: List[float],
+        top_k: int,
+        threshold: float
+    ) -> Tuple[List[Dict], float]:
+        """
+        Retrieve (worker thread), rerank (async HTTP) and merge for an already-embedded query.
+        Returns the results and the seconds this query took.
+        """
+        start_time = time.perf_counter()
+        retrieved_resumes, retrieved_githubs = await asyncio.to_thread(
+            CustomRAGService._retrieve_by_embedding, query_embedding, top_k, threshold
+        )
+
+        if not retrieved_resumes and not retrieved_githubs:
+            logger.warning("No relevant documents found.")
+            return [], time.perf_counter() - start_time
+
+        combined_docs, doc_student_ids, _ = CustomRAGService._build_rerank_inputs(retrieved_resumes, retrieved_githubs)
+
+        # --- Call Cohere reranker over HTTP, speculatively fetching the best vector matches' full resumes meanwhile ---
+        prefetched = None
+        score_source = SCORE_SOURCE_RERANK
+        if len(combined_docs) <= top_k:
+            # Every retrieved student makes the cut anyway - order them by vector similarity and skip the API call
+            rerank_results = CustomRAGService._similarity_results(retrieved_resumes, retrieved_githubs)
+            score_source = SCORE_SOURCE_SIMILARITY
+        else:
+            rerank_results, prefetched = await asyncio.gather(
+                CustomRAGService.rerank_async(query_text, combined_docs),
+                asyncio.to_thread(
+                    CustomRAGService._fetch_resume_texts,
+                    CustomRAGService._likely_top_student_ids(retrieved_resumes, top_k)
+                )
             )
 
-            # --- Return Top K Candidates ---
-            top_results = ranked_candidates[:top_k]
-            logger.info(f"Returning top {len(top_results)} ranked candidates.")
-            return top_results
+        top_results = CustomRAGService._merge_rerank_results(
+            rerank_results, doc_student_ids, retrieved_resumes, retrieved_githubs, top_k, score_source
+        )
+        results = await asyncio.to_thread(CustomRAGService._hydrate_resume_texts, top_results, prefetched)
+        return results, time.perf_counter() - start_time
 
+    @staticmethod
+    def rerank(query_text: str, documents: List[str]) -> List[Tuple[int, float]]:
+        """Rerank documents against a query with the Cohere SDK (cached); returns (index, relevance_score) pairs"""
+        key = _rerank_cache_key(query_text, documents)
+        cached = _get_cached_rerank(key)
+        if cached is not None:
+            return cached
+
+        unique_docs, positions = _dedupe_documents(documents)
+        response = get_cohere_client().rerank(
+            model=RERANK_MODEL,
+            query=query_text,
+            documents=unique_docs
+        )
+        rerank_results = _expand_rerank_results(((r.index, r.relevance_score) for r in response.results), positions)
+        _set_cached_rerank(key, rerank_results)
+        return rerank_results
+
+    @staticmethod
+    async def rerank_async(query_text: str, documents: List[str]) -> List[Tuple[int, float]]:
+        """Rerank documents against a query on the shared async client (cached); returns (index, relevance_score) pairs"""
+        key = _rerank_cache_key(query_text, documents)
+        cached = _get_cached_rerank(key)
+        if cached is not None:
+            return cached
+
+        unique_docs, positions = _dedupe_documents(documents)
+        response = await get_async_cohere_client().post(
+            COHERE_RERANK_URL,
+            json={
+                "model": RERANK_MODEL,
+                "query": query_text,
+                "documents": unique_docs
+            }
+        )
+        response.raise_for_status()
+        rerank_results = _expand_rerank_results(
+            ((r["index"], r["relevance_score"]) for r in response.json()["results"]), positions
+        )
+        _set_cached_rerank(key, rerank_results)
+        return rerank_results
+
+    @staticmethod
+    def _retrieve(query_text: str, top_k: int, threshold: float) -> Tuple[List[Dict], List[Dict]]:
+        """Embed the query and retrieve candidate resumes and GitHub chunks"""
+        # --- Embed the Query ---
+        query_embedding = embedder.generate_embedding(query_text)
+        print("query embedding length:", len(query_embedding))  # should be 384
+
+        return CustomRAGService._retrieve_by_embedding(query_embedding, top_k, threshold)
+
+    @staticmethod
+    def _retrieve_by_embedding(query_embedding: List[float], top_k: int, threshold: float) -> Tuple[List[Dict], List[Dict]]:
+        """Retrieve candidate resumes and GitHub chunks for an embedded query"""
+        # --- Retrieve Relevant Resumes and Github chunks in one call (best matches across both) ---
+        # Documents come back cut to what the reranker is sent; full resumes are fetched for the final top K only
+        logger.info("Searching resumes and GitHub profiles using search_candidates_combined...")
+        matches = VectorStore.search_candidates_combined(
+            query_embedding=query_embedding,
+            top_k=top_k*10,  # retrieve more to give reranker options
+            threshold=threshold,
+            doc_chars=MAX_RERANK_CHARS
+        )
+
+        retrieved_resumes = []
+        retrieved_githubs = []
+        for m in matches:
+            if m["source"] == "resume":
+                retrieved_resumes.append({
+                    "student_id": m["student_id"],
+                    "student_name": m["student_name"],
+                    "resume_text": m["doc_text"],
+                    "similarity": m["similarity"]
+                })
+            else:
+                retrieved_githubs.append({
+                    "student_id": m["student_id"],
+                    "student_name": m["student_name"],
+                    "chunk_text": m["doc_text"],
+                    "similarity": m["similarity"]
+                })
+
+        return retrieved_resumes, retrieved_githubs
+
+    @staticmethod
+    def _similarity_results(retrieved_resumes: List[Dict], retrieved_githubs: List[Dict]) -> List[Tuple[int, float]]:
+        """
+        (index, score) pairs in rerank-result form, scored by the retrieval's vector similarity -
+        indexed like _build_rerank_inputs' docs, best first
+        """
+        similarities = [r.get("similarity") or 0.0 for r in retrieved_resumes]
+        similarities.extend(g.get("similarity") or 0.0 for g in retrieved_githubs)
+        return sorted(enumerate(similarities), key=lambda result: result[1], reverse=True)
+
+    @staticmethod
+    def _fetch_resume_texts(student_ids: List[str]) -> Dict[str, str]:
+        """Full resume text by student id"""
+        if not student_ids:
+            return {}
+        try:
+            response = supabase.table("resume_embeddings").select("student_id, resume_text").in_("student_id", student_ids).execute()
+            return {r["student_id"]: r["resume_text"] for r in reversed(response.data)}
         except Exception as e:
-            logger.error(f"Custom RAG query failed: {str(e)}", exc_info=True)
-            return []
\ No newline at end of file
+            logger.warning(f"Resume text lookup failed: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _likely_top_student_ids(retrieved_resumes: List[Dict], top_k: int) -> List[str]:
+        """Students with the best-matching resumes (retrieval order), the likely rerank winners to prefetch"""
+        student_ids = dict.fromkeys(r["student_id"] for r in retrieved_resumes if r.get("student_id"))
+        return list(student_ids)[:top_k * 2]
+
+    @staticmethod
+    def _hydrate_resume_texts(results: List[Dict], prefetched: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """
+        Swap the retrieval's resume previews for the full texts, for the final candidates only.
+        Texts in `prefetched` are reused and only the rest are fetched (a failed lookup leaves the previews in place).
+        """
+        resume_texts = dict(prefetched or {})
+        resume_texts.update(CustomRAGService._fetch_resume_texts(
+            [r["student_id"] for r in results if r["resume_text"] is not None and r["student_id"] not in resume_texts]
+        ))
+        for r in results:
+            if r["resume_text"] is not None:
+                r["resume_text"] = resume_texts.get(r["student_id"], r["resume_text"])
+        return results
+
+    @staticmethod
+    def _build_rerank_inputs(
+        retrieved_resumes: List[Dict],
+        retrieved_githubs: List[Dict]
+    ) -> Tuple[List[str], List[Optional[str]], bytearray]:
+        """
+        Prepare combined docs for reranking, with parallel per-doc columns (indexed like the docs):
+        the student id and the doc type (DOC_TYPE_RESUME / DOC_TYPE_GITHUB)
+        """
+        # Only the leading part of a document is sent - full texts stay in the retrieved records
+        combined_docs = [r["resume_text"][:MAX_RERANK_CHARS] for r in retrieved_resumes]
+        combined_docs.extend(g["chunk_text"][:MAX_RERANK_CHARS] for g in retrieved_githubs)
+
+        doc_student_ids = [r.get("student_id") for r in retrieved_resumes]
+        doc_student_ids.extend(g.get("student_id") for g in retrieved_githubs)
+
+        doc_types = bytearray([DOC_TYPE_RESUME]) * len(retrieved_resumes) + bytearray([DOC_TYPE_GITHUB]) * len(retrieved_githubs)
+
+        return combined_docs, doc_student_ids, doc_types
+
+    @staticmethod
+    def _merge_rerank_results(
+        rerank_results: List[Tuple[int, float]],
+        doc_student_ids: List[Optional[str]],
+        retrieved_resumes: List[Dict],
+        retrieved_githubs: List[Dict],
+        top_k: int,
+        score_source: str = SCORE_SOURCE_RERANK
+    ) -> List[Dict]:
+        """
+        Merge (index, relevance_score) rerank results into per-student scores and return the top K.
+        score_source says which scale the scores are on and is copied onto every result.
+        """
+        # --- Sum rerank scores per student in one pass (students numbered by first appearance) ---
+        student_index: Dict[str, int] = {}
+        score_sums = [0.0] * len(rerank_results)  # at most one student per rerank result
+        for original_index, score in rerank_results:
+            sid = doc_student_ids[original_index]
+            if sid:
+                score_sums[student_index.setdefault(sid, len(student_index))] += score
+        combined_scores = np.array(score_sums[:len(student_index)], dtype=np.float64)
+
+        # --- Rank by combined score, then build records for the Top K Candidates only ---
+        # Index the retrieved records by student (first record wins, as the old linear scans did)
+        resume_by_sid = {r.get("student_id"): r for r in reversed(retrieved_resumes)}
+        github_by_sid = {g.get("student_id"): g for g in reversed(retrieved_githubs)}
+
+        student_ids = list(student_index)
+        top_results = []
+        for i in top_k_indices(combined_scores, top_k):
+            sid = student_ids[i]
+
+            # We need their name and full resume text - find their original full resume record
+            full_resume_record = resume_by_sid.get(sid)
+
+            student_name = None
+            resume_text = None
+
+            if full_resume_record:
+                student_name = full_resume_record.get("student_name")
+                resume_text = full_resume_record.get("resume_text")
+            else:
+                # If they only had a GitHub match, try to get name from there
+                github_record = github_by_sid.get(sid)
+                if github_record:
+                    student_name = github_record.get("student_name")
+
+            top_results.append({
+                "student_id": sid,
+                "student_name": student_name or "N/A",
+                "resume_text": resume_text, # Only return resume text
+                "combined_score": float(combined_scores[i]),
+                "score_source": score_source,
+            })
+
+        logger.info(f"Returning top {len(top_results)} ranked candidates.")
+        return top_results
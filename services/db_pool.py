@@ -0,0 +1,75 @@
+"""
+Direct Postgres connection pool (asyncpg) for hot read paths.
+
+PostgREST calls through the supabase client cost one HTTPS round-trip each and
+run synchronously; the agent tools' per-request lookups go straight to Postgres
+through this pool instead when SUPABASE_DB_URL is configured.
+
+SUPABASE_DB_URL must be the direct (session) connection string - the transaction
+pooler on port 6543 does not support the prepared statements cached here.
+"""
+
+import asyncio
+import json
+import os
+import logging
+from typing import Dict, Optional
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.getenv("SUPABASE_DB_URL")
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Decode json/jsonb columns to Python objects, like PostgREST does"""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def get_pool() -> Optional[asyncpg.Pool]:
+    """Get the shared pool, creating it on first use. Returns None if SUPABASE_DB_URL isn't set."""
+    global _pool
+    if DB_URL is None:
+        return None
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    dsn=DB_URL,
+                    min_size=10,
+                    max_size=50,
+                    max_inactive_connection_lifetime=300,
+                    statement_cache_size=1024,
+                    init=_init_connection
+                )
+                logger.info("Postgres connection pool created")
+    return _pool
+
+
+async def close_pool():
+    """Close the shared pool (app shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pool_stats() -> Dict:
+    """Get pool statistics"""
+    if _pool is None:
+        return {"configured": DB_URL is not None, "initialized": False}
+    return {
+        "configured": True,
+        "initialized": True,
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size()
+    }
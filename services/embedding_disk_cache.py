@@ -0,0 +1,58 @@
+"""
+On-disk embedding cache shared by every worker process.
+
+SQLite (WAL mode) keyed by the embedding service's text digest, scoped by a
+namespace (model + backend) so vectors from different models never mix.
+Vectors are stored as raw float32 bytes, so a cached vector is bit-identical to
+a freshly computed one.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+
+class EmbeddingDiskCache:
+    """Persistent key -> float32 vector store"""
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " namespace TEXT NOT NULL, key BLOB NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached vectors for the keys that are present (read-only arrays)"""
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE namespace = ? AND key IN ({placeholders})",
+                (self.namespace, *keys)
+            ).fetchall()
+        # np.frombuffer over bytes is already read-only
+        return {bytes(key): np.frombuffer(vector, dtype=np.float32) for key, vector in rows}
+
+    def set_many(self, items: Iterable[Tuple[bytes, np.ndarray]]):
+        """Store (key, vector) pairs"""
+        rows = [(self.namespace, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        if not rows:
+            return
+        # One transaction for the batch (the connection is otherwise in autocommit mode)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (namespace, key, vector) VALUES (?, ?, ?)", rows)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
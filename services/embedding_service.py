@@ -1,22 +1,161 @@
 from sentence_transformers import SentenceTransformer
-from typing import List
+from cachetools import LRUCache
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+from services.embedding_disk_cache import EmbeddingDiskCache
+import hashlib
+import os
+import threading
+import numpy as np
+
+load_dotenv()
+
+# "onnx" serves the model through ONNX Runtime (needs `pip install sentence-transformers[onnx]`);
+# the exported model is cached by huggingface-hub, so only the first start pays for the export
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Optional ONNX file from the model repo, e.g. onnx/model_qint8_avx512_vnni.onnx for int8 -
+# only if the stored resume/GitHub embeddings were re-generated with the same file
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE")
+# SQLite file persisting embeddings across restarts and worker processes (set to an empty value to disable)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite3")
 
 class EmbeddingService:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"): # it's a lightweight version of BERT
         """Initialise embedding model"""
         print(f"Loading embedding model: {model_name}...")
-        self.model = SentenceTransformer(model_name)
+        self.model = self._load_model(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
         print(f"Model loaded! Dimension: {self.dimension}")
+        
+        # Recently embedded texts (repeated queries skip the model), as float32 arrays (~1.5 KB each);
+        # keyed by digest so long texts aren't kept
+        self._cache = LRUCache(maxsize=256)
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.disk_cache_hits = 0
+        self.cache_misses = 0
+        self._disk_cache = self._open_disk_cache(model_name)
+        
+        # An uncased WordPiece model (like MiniLM) lowercases and splits on whitespace before embedding,
+        # so texts differing only in case/spacing embed identically and can share a cache entry
+        self._normalize_key = bool(getattr(self.model.tokenizer, "do_lower_case", False))
+    
+    @staticmethod
+    def _load_model(model_name: str) -> SentenceTransformer:
+        """Load the model on the configured backend, falling back to PyTorch if ONNX Runtime isn't usable"""
+        if EMBEDDING_BACKEND == "onnx":
+            model_kwargs = {"file_name": EMBEDDING_ONNX_FILE} if EMBEDDING_ONNX_FILE else None
+            try:
+                return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+            except Exception as e:
+                print(f"ONNX backend unavailable ({e}), falling back to PyTorch")
+        return SentenceTransformer(model_name)
+    
+    @staticmethod
+    def _open_disk_cache(model_name: str) -> Optional[EmbeddingDiskCache]:
+        """Open the persistent cache, scoped to this model + backend (None if disabled or unusable)"""
+        if not EMBEDDING_CACHE_PATH:
+            return None
+        namespace = f"{model_name}:{EMBEDDING_BACKEND}:{EMBEDDING_ONNX_FILE or ''}"
+        try:
+            return EmbeddingDiskCache(EMBEDDING_CACHE_PATH, namespace)
+        except Exception as e:
+            print(f"Embedding disk cache disabled ({e})")
+            return None
+    
+    def _cache_key(self, text: str) -> bytes:
+        if self._normalize_key:
+            text = " ".join(text.lower().split())
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+    
+    def generate_embedding_array(self, text: str) -> np.ndarray:
+        """
+        Embedding as a read-only float32 array (the model's native output) - for callers doing
+        vector math locally. Use generate_embedding when the vector goes to Supabase/JSON.
+        """
+        key = self._cache_key(text)
+        cached = self._get_cached([key])[key]
+        if cached is None:
+            cached = self._freeze(self.model.encode(text))
+            self._store({key: cached})
+        return cached
     
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
-        embedding = self.model.encode(text)
-        return embedding.tolist()
+        return self.generate_embedding_array(text).tolist()
+    
+    def generate_query_embeddings(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """
+        Embed several queries at once: cached ones come from the LRU / disk cache and the rest
+        are encoded together in one batched model call (and cached).
+        """
+        keys = [self._cache_key(text) for text in texts]
+        cached = self._get_cached(keys)
+        
+        missing = {}  # cache key -> text, so duplicate texts are encoded once
+        for key, text in zip(keys, texts):
+            if cached[key] is None:
+                missing.setdefault(key, text)
+        
+        if missing:
+            encoded = self.model.encode(list(missing.values()), batch_size=batch_size, show_progress_bar=False)
+            new_entries = {key: self._freeze(row) for key, row in zip(missing, encoded)}
+            self._store(new_entries)
+            cached.update(new_entries)
+        
+        return [cached[key].tolist() for key in keys]
+    
+    def _get_cached(self, keys: List[bytes]) -> Dict[bytes, Optional[np.ndarray]]:
+        """Look keys up in the LRU cache, then the disk cache (promoting disk hits); None for misses"""
+        with self._cache_lock:
+            cached = {key: self._cache.get(key) for key in keys}
+        
+        disk_keys = [key for key, value in cached.items() if value is None]
+        disk_hits = {}
+        if disk_keys and self._disk_cache is not None:
+            try:
+                disk_hits = self._disk_cache.get_many(disk_keys)
+            except Exception as e:
+                print(f"Embedding disk cache read failed: {e}")
+            cached.update(disk_hits)
+        
+        with self._cache_lock:
+            self._cache.update(disk_hits)
+            self.cache_hits += len(keys) - len(disk_keys)
+            self.disk_cache_hits += len(disk_hits)
+            self.cache_misses += len(disk_keys) - len(disk_hits)
+        return cached
+    
+    def _store(self, entries: Dict[bytes, np.ndarray]):
+        """Add freshly computed embeddings to the LRU cache and the disk cache"""
+        with self._cache_lock:
+            self._cache.update(entries)
+        if self._disk_cache is not None:
+            try:
+                self._disk_cache.set_many(entries.items())
+            except Exception as e:
+                print(f"Embedding disk cache write failed: {e}")
+    
+    @staticmethod
+    def _freeze(vector: np.ndarray) -> np.ndarray:
+        """float32, read-only copy for the cache (so callers can't mutate a shared vector)"""
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        return vector
+    
+    def get_cache_stats(self) -> dict:
+        """Embedding cache statistics"""
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "disk_hits": self.disk_cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._cache)
+            }
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """Generate embeddings for multiple texts"""
-        embeddings = self.model.encode(texts)
+        embeddings = self.model.encode(texts, batch_size=batch_size)
         return embeddings.tolist()
     
     # we can do chunking in this file if needed 
\ No newline at end of file
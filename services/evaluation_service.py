@@ -7,7 +7,7 @@ Provides metrics and analysis for academic comparison.
 import time
 from typing import Dict, List, Tuple
 from dataclasses import dataclass, field
-import statistics
+import numpy as np
 
 
 @dataclass
@@ -82,10 +82,10 @@ class EvaluationService:
         """Create metrics from execution results"""
         
         # Calculate quality metrics
-        fit_scores = [c.get("fit_score", 0) for c in candidates]
-        top_fit_score = max(fit_scores) if fit_scores else 0.0
-        avg_fit_score = statistics.mean(fit_scores) if fit_scores else 0.0
-        high_quality_count = sum(1 for score in fit_scores if score >= min_fit_score)
+        fit_scores = np.fromiter((c.get("fit_score", 0) for c in candidates), dtype=np.float64, count=len(candidates))
+        top_fit_score = float(fit_scores.max(initial=0.0))
+        avg_fit_score = float(fit_scores.mean()) if fit_scores.size else 0.0
+        high_quality_count = int((fit_scores >= min_fit_score).sum())
         
         return ArchitectureMetrics(
             architecture=architecture,
@@ -242,19 +242,35 @@ class EvaluationService:
         if not self.results:
             return {"error": "No comparison results available"}
         
-        # Count wins
-        rule_based_wins = sum(1 for r in self.results if r.winner == "rule-based")
-        agentic_wins = sum(1 for r in self.results if r.winner == "agentic")
-        ties = sum(1 for r in self.results if r.winner == "tie")
+        # One row per comparison, one column per metric - every aggregate is a column sum/mean
+        metrics = np.array(
+            [
+                (
+                    r.speedup_factor,
+                    r.cost_ratio,
+                    r.quality_improvement,
+                    r.rule_based.goal_achieved,
+                    r.agentic.goal_achieved,
+                    r.winner == "rule-based",
+                    r.winner == "agentic",
+                    r.winner == "tie"
+                )
+                for r in self.results
+            ],
+            dtype=np.float64
+        )
         
-        # Average metrics
-        avg_speedup = statistics.mean([r.speedup_factor for r in self.results])
-        avg_cost_ratio = statistics.mean([r.cost_ratio for r in self.results])
-        avg_quality_improvement = statistics.mean([r.quality_improvement for r in self.results])
+        # Count wins
+        rule_based_wins, agentic_wins, ties = (int(n) for n in metrics[:, 5:8].sum(axis=0))
         
-        # Goal achievement rates
-        rule_based_goal_rate = sum(1 for r in self.results if r.rule_based.goal_achieved) / len(self.results)
-        agentic_goal_rate = sum(1 for r in self.results if r.agentic.goal_achieved) / len(self.results)
+        # Average metrics and goal achievement rates
+        (
+            avg_speedup,
+            avg_cost_ratio,
+            avg_quality_improvement,
+            rule_based_goal_rate,
+            agentic_goal_rate
+        ) = (float(m) for m in metrics[:, :5].mean(axis=0))
         
         return {
             "total_comparisons": len(self.results),
@@ -1,10 +1,181 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from services.llm_client import llm_client
+from services.llm_cache import github_analysis_cache, ExactResponseCache
 from services.vector_store import VectorStore
 from utils.json_parser import format_response
 
 
+# Sections of the "full" analysis JSON, in the order they are returned
+FULL_ANALYSIS_SECTIONS = {
+    "executive_summary": """                "executive_summary": {
+                    "one_liner": "Concise one-sentence summary of this developer's profile",
+                    "profile_strength": "strong|moderate|developing",
+                    "standout_qualities": ["Quality 1", "Quality 2", "Quality 3"],
+                    "primary_technical_identity": "e.g., Full-Stack Developer, Data Scientist, Mobile Developer"
+                }""",
+    "project_analysis": """                "project_analysis": [
+                    {
+                        "repo_name": "Repository name",
+                        "one_line_summary": "What this project does in one sentence",
+                        "detailed_summary": "2-3 sentences explaining the project, its purpose, and impact",
+                        "problem_solved": "What problem does this solve?",
+                        "solution_approach": "How does it solve it?",
+                        "technical_highlights": ["Tech 1", "Tech 2", "Tech 3"],
+                        "code_quality_score": 7,
+                        "code_quality_notes": "What makes this code good/improvable",
+                        "architecture_notes": "Brief notes on architecture/design patterns used",
+                        "complexity_level": "beginner|intermediate|advanced",
+                        "portfolio_value": "high|medium|low",
+                        "portfolio_value_reason": "Why this project is valuable for portfolio"
+                    }
+                ]""",
+    "technical_stack_analysis": """                "technical_stack_analysis": {
+                    "primary_languages": ["Language 1", "Language 2"],
+                    "frameworks_libraries": ["Framework 1", "Framework 2", "Framework 3"],
+                    "tools_platforms": ["Tool 1", "Tool 2"],
+                    "technical_depth_score": 7,
+                    "technical_breadth_score": 6,
+                    "trending_technologies": ["Tech that's currently in demand"],
+                    "skill_gaps": ["Skills that would complement their stack"],
+                    "market_relevance_notes": "How their stack aligns with current job market"
+                }""",
+    "interview_preparation": """                "interview_preparation": {
+                    "project_talking_points": [
+                        {
+                            "project": "Project name",
+                            "talking_points": [
+                                "Key point 1 to mention in interviews",
+                                "Key point 2 to mention in interviews",
+                                "Key point 3 to mention in interviews"
+                            ]
+                        }
+                    ],
+                    "expected_questions": [
+                        {
+                            "question": "Technical question an interviewer might ask",
+                            "suggested_answer_approach": "How to structure the answer",
+                            "related_projects": ["Projects to reference in answer"]
+                        }
+                    ],
+                    "technical_deep_dive_topics": [
+                        "Topic 1 to prepare for deep technical discussions",
+                        "Topic 2 to prepare for deep technical discussions"
+                    ],
+                    "behavioral_story_opportunities": [
+                        "Challenge/accomplishment story they can tell based on projects"
+                    ],
+                    "weakness_mitigation": [
+                        "How to address potential weak spots in their experience"
+                    ]
+                }""",
+    "resume_content": """                "resume_content": {
+                    "professional_summary": "2-3 sentence summary for top of resume",
+                    "project_bullet_points": [
+                        {
+                            "project": "Project name",
+                            "bullets": [
+                                "• Action-oriented bullet point 1 (quantify if possible)",
+                                "• Action-oriented bullet point 2 (quantify if possible)",
+                                "• Action-oriented bullet point 3 (quantify if possible)"
+                            ]
+                        }
+                    ],
+                    "skills_section": {
+                        "languages": ["Language 1", "Language 2"],
+                        "frameworks": ["Framework 1", "Framework 2"],
+                        "tools": ["Tool 1", "Tool 2"],
+                        "concepts": ["Concept 1 (e.g., RESTful APIs, Microservices)"]
+                    },
+                    "ats_keywords": [
+                        "Keyword 1 that ATS systems look for",
+                        "Keyword 2 that ATS systems look for"
+                    ],
+                    "action_verbs": [
+                        "Strong action verb 1 for resume",
+                        "Strong action verb 2 for resume"
+                    ]
+                }""",
+    "portfolio_presentation": """                "portfolio_presentation": {
+                    "github_profile_tagline": "Catchy one-liner for GitHub bio",
+                    "linkedin_headline": "Professional headline for LinkedIn",
+                    "portfolio_website_intro": "2-3 sentence intro for portfolio website",
+                    "project_descriptions": [
+                        {
+                            "project": "Project name",
+                            "short_description": "One sentence for GitHub repo description",
+                            "detailed_description": "2-3 sentences for portfolio website/README",
+                            "demo_suggestions": "What to show in a demo or include in screenshots"
+                        }
+                    ],
+                    "readme_improvement_tips": [
+                        "Tip 1 for improving READMEs",
+                        "Tip 2 for improving READMEs"
+                    ]
+                }""",
+    "job_fit_analysis": """                "job_fit_analysis": {
+                    "ideal_roles": [
+                        {
+                            "title": "Job title",
+                            "fit_score": 8,
+                            "reasoning": "Why they're a good fit",
+                            "companies_to_target": ["Type of company 1", "Type of company 2"]
+                        }
+                    ],
+                    "suitable_industries": ["Industry 1", "Industry 2", "Industry 3"],
+                    "experience_level": "entry|junior|mid|senior",
+                    "salary_range_estimate": "Estimated range based on skills and experience",
+                    "competitive_advantages": ["What makes them stand out"],
+                    "areas_for_growth": ["What to work on to be more competitive"]
+                }""",
+    "market_insights": """                "market_insights": {
+                    "trending_tech_alignment": {
+                        "aligned": ["Tech they use that's trending"],
+                        "not_aligned": ["Trending tech they should learn"]
+                    },
+                    "hiring_demand_notes": "Current hiring trends relevant to their profile",
+                    "skill_demand_score": 7,
+                    "hot_job_markets": ["Geographic/remote markets with demand for their skills"]
+                }""",
+    "actionable_next_steps": """                "actionable_next_steps": [
+                    {
+                        "priority": "high|medium|low",
+                        "action": "Specific action to take",
+                        "reasoning": "Why this will help",
+                        "estimated_effort": "Time/effort estimate",
+                        "expected_impact": "high|medium|low"
+                    }
+                ]""",
+    "overall_assessment": """                "overall_assessment": {
+                    "portfolio_strength_score": 7,
+                    "job_readiness_score": 6,
+                    "key_strengths": ["Strength 1", "Strength 2", "Strength 3"],
+                    "key_opportunities": ["Opportunity 1", "Opportunity 2"],
+                    "bottom_line": "Final encouraging and actionable summary"
+                }"""
+}
+
+# The "full" analysis is generated as these parts (concurrent LLM calls), each covering a few sections
+FULL_ANALYSIS_GROUPS = [
+    ("overview", ["executive_summary", "overall_assessment", "actionable_next_steps"]),
+    ("projects", ["project_analysis"]),
+    ("tech_stack", ["technical_stack_analysis", "market_insights"]),
+    ("interview", ["interview_preparation"]),
+    ("presentation", ["resume_content", "portfolio_presentation"]),
+    ("job_fit", ["job_fit_analysis"])
+]
+
+# Text chunks (from github_embeddings) joined into each repository's full_text
+MAX_REPO_TEXT_CHUNKS = 3
+
+# Repository text (first chunks of README/code) included per repo in portfolio-wide prompts
+MAX_REPO_TEXT_CHARS = 2000
+
+# Runs the parts of a "full" analysis concurrently
+ANALYSIS_POOL = ThreadPoolExecutor(max_workers=12, thread_name_prefix="github_analysis")
+
+
 class GitHubAnalysisService:
     """
     Comprehensive AI-powered analysis of GitHub portfolios to help students
@@ -24,6 +195,27 @@ class GitHubAnalysisService:
     def __init__(self):
         self.llm = llm_client
     
+    def _generate_text(self, analysis_type: str, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> str:
+        """
+        self.llm.generate_text, served from github_analysis_cache for a prompt seen before.
+        The prompt embeds the portfolio data, so a changed portfolio never hits a stale analysis.
+        Only responses that parse as JSON are cached (LLM errors and malformed output are retried next time).
+        """
+        key = ExactResponseCache.key(analysis_type, system_prompt, user_prompt, temperature)
+        response = github_analysis_cache.get(key)
+        if response is None:
+            response = self.llm.generate_text(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=temperature
+            )
+            try:
+                format_response(response)
+            except ValueError:
+                return response
+            github_analysis_cache.set(key, response)
+        return response
+    
     def analyze_portfolio_comprehensive(
         self, 
         student_id: str,
@@ -87,13 +279,14 @@ class GitHubAnalysisService:
                 .execute()
             
             if response.data:
-                # Group by repo_name and aggregate information
+                # Group by repo_name and aggregate information in one pass
                 repos_dict = {}
                 for item in response.data:
                     repo_name = item.get("repo_name")
-                    if repo_name not in repos_dict:
+                    repo_data = repos_dict.get(repo_name)
+                    if repo_data is None:
                         metadata = item.get("metadata", {})
-                        repos_dict[repo_name] = {
+                        repo_data = repos_dict[repo_name] = {
                             "name": repo_name,
                             "description": metadata.get("description", ""),
                             "language": metadata.get("language", ""),
@@ -102,19 +295,16 @@ class GitHubAnalysisService:
                             "text_chunks": [],
                             "metadata": metadata
                         }
-                    # Add text chunk
+                    # Add text chunk - only the first MAX_REPO_TEXT_CHUNKS are used, so stop collecting there
                     text = item.get("text", "")
-                    if text:
-                        repos_dict[repo_name]["text_chunks"].append(text)
+                    if text and len(repo_data["text_chunks"]) < MAX_REPO_TEXT_CHUNKS:
+                        repo_data["text_chunks"].append(text)
                 
-                # Combine text chunks for each repo
-                repositories = []
-                for repo_name, repo_data in repos_dict.items():
-                    repo_data["full_text"] = "\n\n".join(repo_data["text_chunks"][:3])  # First 3 chunks
-                    del repo_data["text_chunks"]  # Remove raw chunks
-                    repositories.append(repo_data)
+                # Combine text chunks for each repo (popping the raw chunks)
+                for repo_data in repos_dict.values():
+                    repo_data["full_text"] = "\n\n".join(repo_data.pop("text_chunks"))
                 
-                portfolio_data["repositories"] = repositories
+                portfolio_data["repositories"] = list(repos_dict.values())
                 
         except Exception as e:
             print(f"Error enriching portfolio data: {str(e)}")
@@ -124,9 +314,38 @@ class GitHubAnalysisService:
         
         return portfolio_data
     
+    @staticmethod
+    def _compact_repo(repo: Dict, max_text_chars: Optional[int] = MAX_REPO_TEXT_CHARS) -> Dict:
+        """
+        The repository fields the analyses use - the raw GitHub metadata blob is dropped
+        and the text capped at max_text_chars (None keeps all of it)
+        """
+        return {
+            "name": repo.get("name"),
+            "description": repo.get("description", ""),
+            "language": repo.get("language", ""),
+            "topics": repo.get("topics", []),
+            "stars": repo.get("stars", 0),
+            "summary_text": (repo.get("full_text") or "")[:max_text_chars]
+        }
+    
+    def _portfolio_json(self, portfolio_data: Dict) -> str:
+        """
+        Compact JSON of the portfolio for LLM prompts: the aggregate fields plus a lean
+        projection of each repository, without indentation (whitespace costs tokens too).
+        """
+        compact = {key: value for key, value in portfolio_data.items() if key != "repositories"}
+        compact["repositories"] = [
+            self._compact_repo(repo) if isinstance(repo, dict) else repo  # plain names if enrichment failed
+            for repo in portfolio_data.get("repositories", [])
+        ]
+        return json.dumps(compact, separators=(",", ":"))
+    
     def _analyze_full_portfolio(self, portfolio_data: Dict, github_username: str) -> Dict:
         """
         Complete comprehensive analysis covering all aspects.
+        The sections are generated by concurrent LLM calls (FULL_ANALYSIS_GROUPS) and merged, so the
+        analysis takes about as long as its slowest part instead of one very long response.
         """
         system_prompt = """
             You are an expert technical recruiter and career coach specializing in software engineering portfolios.
@@ -141,174 +360,56 @@ class GitHubAnalysisService:
             **CRITICAL: Return ONLY valid JSON. No markdown, no code blocks, no explanatory text.**
             """
         
+        portfolio_json = self._portfolio_json(portfolio_data)
+        
+        futures = [
+            ANALYSIS_POOL.submit(
+                self._analyze_full_portfolio_part, system_prompt, portfolio_json, github_username, part, section_names
+            )
+            for part, section_names in FULL_ANALYSIS_GROUPS
+        ]
+        
+        analysis = {}
+        for future in futures:
+            part_analysis = future.result()
+            # All-or-nothing like the single-call analysis; finished parts are cached, so a retry only redoes the failed ones
+            if "error" in part_analysis:
+                return part_analysis
+            analysis.update(part_analysis)
+        
+        ordered = {name: analysis.pop(name) for name in FULL_ANALYSIS_SECTIONS if name in analysis}
+        ordered.update(analysis)
+        return ordered
+    
+    def _analyze_full_portfolio_part(
+        self,
+        system_prompt: str,
+        portfolio_json: str,
+        github_username: str,
+        part: str,
+        section_names: List[str]
+    ) -> Dict:
+        """
+        One part of the full analysis: the given sections of the full JSON structure.
+        """
+        sections = ",\n\n".join(FULL_ANALYSIS_SECTIONS[name] for name in section_names)
+        
         user_prompt = f"""
-            Analyze this GitHub portfolio for {github_username} and provide a comprehensive analysis.
+            Analyze this GitHub portfolio for {github_username} and provide these sections of a comprehensive analysis.
 
             **Portfolio Data:**
-            {json.dumps(portfolio_data, indent=2)}
+            {portfolio_json}
 
             Provide analysis in the following JSON structure:
 
             {{
-                "executive_summary": {{
-                    "one_liner": "Concise one-sentence summary of this developer's profile",
-                    "profile_strength": "strong|moderate|developing",
-                    "standout_qualities": ["Quality 1", "Quality 2", "Quality 3"],
-                    "primary_technical_identity": "e.g., Full-Stack Developer, Data Scientist, Mobile Developer"
-                }},
-                
-                "project_analysis": [
-                    {{
-                        "repo_name": "Repository name",
-                        "one_line_summary": "What this project does in one sentence",
-                        "detailed_summary": "2-3 sentences explaining the project, its purpose, and impact",
-                        "problem_solved": "What problem does this solve?",
-                        "solution_approach": "How does it solve it?",
-                        "technical_highlights": ["Tech 1", "Tech 2", "Tech 3"],
-                        "code_quality_score": 7,
-                        "code_quality_notes": "What makes this code good/improvable",
-                        "architecture_notes": "Brief notes on architecture/design patterns used",
-                        "complexity_level": "beginner|intermediate|advanced",
-                        "portfolio_value": "high|medium|low",
-                        "portfolio_value_reason": "Why this project is valuable for portfolio"
-                    }}
-                ],
-                
-                "technical_stack_analysis": {{
-                    "primary_languages": ["Language 1", "Language 2"],
-                    "frameworks_libraries": ["Framework 1", "Framework 2", "Framework 3"],
-                    "tools_platforms": ["Tool 1", "Tool 2"],
-                    "technical_depth_score": 7,
-                    "technical_breadth_score": 6,
-                    "trending_technologies": ["Tech that's currently in demand"],
-                    "skill_gaps": ["Skills that would complement their stack"],
-                    "market_relevance_notes": "How their stack aligns with current job market"
-                }},
-                
-                "interview_preparation": {{
-                    "project_talking_points": [
-                        {{
-                            "project": "Project name",
-                            "talking_points": [
-                                "Key point 1 to mention in interviews",
-                                "Key point 2 to mention in interviews",
-                                "Key point 3 to mention in interviews"
-                            ]
-                        }}
-                    ],
-                    "expected_questions": [
-                        {{
-                            "question": "Technical question an interviewer might ask",
-                            "suggested_answer_approach": "How to structure the answer",
-                            "related_projects": ["Projects to reference in answer"]
-                        }}
-                    ],
-                    "technical_deep_dive_topics": [
-                        "Topic 1 to prepare for deep technical discussions",
-                        "Topic 2 to prepare for deep technical discussions"
-                    ],
-                    "behavioral_story_opportunities": [
-                        "Challenge/accomplishment story they can tell based on projects"
-                    ],
-                    "weakness_mitigation": [
-                        "How to address potential weak spots in their experience"
-                    ]
-                }},
-                
-                "resume_content": {{
-                    "professional_summary": "2-3 sentence summary for top of resume",
-                    "project_bullet_points": [
-                        {{
-                            "project": "Project name",
-                            "bullets": [
-                                "• Action-oriented bullet point 1 (quantify if possible)",
-                                "• Action-oriented bullet point 2 (quantify if possible)",
-                                "• Action-oriented bullet point 3 (quantify if possible)"
-                            ]
-                        }}
-                    ],
-                    "skills_section": {{
-                        "languages": ["Language 1", "Language 2"],
-                        "frameworks": ["Framework 1", "Framework 2"],
-                        "tools": ["Tool 1", "Tool 2"],
-                        "concepts": ["Concept 1 (e.g., RESTful APIs, Microservices)"]
-                    }},
-                    "ats_keywords": [
-                        "Keyword 1 that ATS systems look for",
-                        "Keyword 2 that ATS systems look for"
-                    ],
-                    "action_verbs": [
-                        "Strong action verb 1 for resume",
-                        "Strong action verb 2 for resume"
-                    ]
-                }},
-                
-                "portfolio_presentation": {{
-                    "github_profile_tagline": "Catchy one-liner for GitHub bio",
-                    "linkedin_headline": "Professional headline for LinkedIn",
-                    "portfolio_website_intro": "2-3 sentence intro for portfolio website",
-                    "project_descriptions": [
-                        {{
-                            "project": "Project name",
-                            "short_description": "One sentence for GitHub repo description",
-                            "detailed_description": "2-3 sentences for portfolio website/README",
-                            "demo_suggestions": "What to show in a demo or include in screenshots"
-                        }}
-                    ],
-                    "readme_improvement_tips": [
-                        "Tip 1 for improving READMEs",
-                        "Tip 2 for improving READMEs"
-                    ]
-                }},
-                
-                "job_fit_analysis": {{
-                    "ideal_roles": [
-                        {{
-                            "title": "Job title",
-                            "fit_score": 8,
-                            "reasoning": "Why they're a good fit",
-                            "companies_to_target": ["Type of company 1", "Type of company 2"]
-                        }}
-                    ],
-                    "suitable_industries": ["Industry 1", "Industry 2", "Industry 3"],
-                    "experience_level": "entry|junior|mid|senior",
-                    "salary_range_estimate": "Estimated range based on skills and experience",
-                    "competitive_advantages": ["What makes them stand out"],
-                    "areas_for_growth": ["What to work on to be more competitive"]
-                }},
-                
-                "market_insights": {{
-                    "trending_tech_alignment": {{
-                        "aligned": ["Tech they use that's trending"],
-                        "not_aligned": ["Trending tech they should learn"]
-                    }},
-                    "hiring_demand_notes": "Current hiring trends relevant to their profile",
-                    "skill_demand_score": 7,
-                    "hot_job_markets": ["Geographic/remote markets with demand for their skills"]
-                }},
-                
-                "actionable_next_steps": [
-                    {{
-                        "priority": "high|medium|low",
-                        "action": "Specific action to take",
-                        "reasoning": "Why this will help",
-                        "estimated_effort": "Time/effort estimate",
-                        "expected_impact": "high|medium|low"
-                    }}
-                ],
-                
-                "overall_assessment": {{
-                    "portfolio_strength_score": 7,
-                    "job_readiness_score": 6,
-                    "key_strengths": ["Strength 1", "Strength 2", "Strength 3"],
-                    "key_opportunities": ["Opportunity 1", "Opportunity 2"],
-                    "bottom_line": "Final encouraging and actionable summary"
-                }}
+{sections}
             }}
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                f"full:{part}",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.7
@@ -316,11 +417,13 @@ class GitHubAnalysisService:
             
             # Parse JSON response
             parsed = format_response(response)
+            if not isinstance(parsed, dict):
+                raise ValueError("expected a JSON object")
             return parsed
             
         except Exception as e:
             return {
-                "error": f"Analysis failed: {str(e)}",
+                "error": f"Analysis failed ({part}): {str(e)}",
                 "raw_response": response if 'response' in locals() else None
             }
     
@@ -339,7 +442,7 @@ class GitHubAnalysisService:
             Quick review of {github_username}'s GitHub portfolio:
 
             **Portfolio Data:**
-            {json.dumps(portfolio_data, indent=2)}
+            {self._portfolio_json(portfolio_data)}
 
             Return JSON:
             {{
@@ -353,7 +456,8 @@ class GitHubAnalysisService:
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                "quick",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.5
@@ -377,7 +481,7 @@ class GitHubAnalysisService:
             Help {github_username} prepare for technical interviews based on their GitHub portfolio:
 
             **Portfolio Data:**
-            {json.dumps(portfolio_data, indent=2)}
+            {self._portfolio_json(portfolio_data)}
 
             Return JSON:
             {{
@@ -416,7 +520,8 @@ class GitHubAnalysisService:
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                "interview_prep",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.6
@@ -447,7 +552,7 @@ class GitHubAnalysisService:
             Create resume content for {github_username} based on their GitHub portfolio:
 
             **Portfolio Data:**
-            {json.dumps(portfolio_data, indent=2)}
+            {self._portfolio_json(portfolio_data)}
 
             Return JSON:
             {{
@@ -488,7 +593,8 @@ class GitHubAnalysisService:
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                "resume",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.5
@@ -512,7 +618,7 @@ class GitHubAnalysisService:
             Analyze job fit for {github_username} based on their GitHub portfolio:
 
             **Portfolio Data:**
-            {json.dumps(portfolio_data, indent=2)}
+            {self._portfolio_json(portfolio_data)}
 
             Return JSON:
             {{
@@ -568,7 +674,8 @@ class GitHubAnalysisService:
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                "job_fit",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.6
@@ -627,7 +734,7 @@ class GitHubAnalysisService:
             Provide a deep-dive analysis of this GitHub project:
 
             **Project Data:**
-            {json.dumps(repo_data, indent=2)}
+            {json.dumps(self._compact_repo(repo_data, max_text_chars=None), separators=(",", ":"))}
 
             Focus: {analysis_focus}
 
@@ -730,7 +837,8 @@ class GitHubAnalysisService:
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                "project_deep_dive",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.6
@@ -773,7 +881,7 @@ class GitHubAnalysisService:
             Compare this portfolio against requirements for a {target_role} role:
 
             **Portfolio Data:**
-            {json.dumps(portfolio_data, indent=2)}
+            {self._portfolio_json(portfolio_data)}
 
             Return JSON:
             {{
@@ -821,7 +929,8 @@ class GitHubAnalysisService:
             """
         
         try:
-            response = self.llm.generate_text(
+            response = self._generate_text(
+                "portfolio_comparison",
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 temperature=0.6
@@ -1,10 +1,10 @@
-import requests
 import json
 import base64
 import os
 from typing import List, Dict, Optional
 from datetime import datetime
 from dotenv import load_dotenv
+from services.http_client import http_session
 
 load_dotenv()
 
@@ -27,6 +27,7 @@ class GitHubDataFetcher:
             "Authorization": f"Bearer {access_token}",
             "Accept": "application/vnd.github.v3+json"
         }
+        self.session = http_session  # Shared keep-alive pool across API calls
     
     def get_user_repos(self, username: str, max_repos: int = 100) -> List[Dict]:
         """
@@ -52,7 +53,7 @@ class GitHubDataFetcher:
                 "direction": "desc"
             }
             
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self.session.get(url, headers=self.headers, params=params)
             
             if response.status_code != 200:
                 print(f"Error fetching repos: {response.status_code}")
@@ -83,7 +84,7 @@ class GitHubDataFetcher:
             Dictionary with repo details
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         
         if response.status_code == 200:
             return response.json()
@@ -101,7 +102,7 @@ class GitHubDataFetcher:
             README content as string, or None if not found
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}/readme"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -121,7 +122,7 @@ class GitHubDataFetcher:
             Dictionary mapping language names to bytes of code
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}/languages"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         
         if response.status_code == 200:
             return response.json()
@@ -140,7 +141,7 @@ class GitHubDataFetcher:
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}/topics"
         headers = {**self.headers, "Accept": "application/vnd.github.mercy-preview+json"}
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
         
         if response.status_code == 200:
             return response.json().get('names', [])
@@ -160,7 +161,7 @@ class GitHubDataFetcher:
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}/commits"
         params = {"per_page": limit}
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, headers=self.headers, params=params)
         
         if response.status_code == 200:
             return response.json()
@@ -179,7 +180,7 @@ class GitHubDataFetcher:
             List of file/directory dictionaries
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}/git/trees/{branch}?recursive=1"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         
         if response.status_code == 200:
             return response.json().get('tree', [])
@@ -202,7 +203,7 @@ class GitHubDataFetcher:
             File content as string, or None if not found
         """
         url = f"{self.base_url}/repos/{owner}/{repo_name}/contents/{file_path}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         
         if response.status_code == 200:
             data = response.json()
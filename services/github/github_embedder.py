@@ -298,30 +298,54 @@ class GitHubDocumentProcessor:
         print(f"\nTotal documents created: {len(all_documents)}")
         return all_documents
     
-    def embed_documents(self, documents: List[Dict]) -> List[Dict]:
+    def embed_documents(self, documents: List[Dict], batch_size: int = 96) -> List[Dict]:
         """
         Generate embeddings for all documents using existing EmbeddingService.
+        All texts go through the model in one batched call instead of one call per chunk.
         
         Args:
             documents: List of document dictionaries with 'text' field
+            batch_size: Number of texts encoded per model forward pass (default: 96)
             
         Returns:
-            Documents with added 'embedding' field
+            Documents with added 'embedding' field (documents that failed to embed are dropped)
         """
         print(f"Generating embeddings for {len(documents)} documents...")
         
         # Extract texts for batch embedding
         texts = [doc["text"] for doc in documents]
         
-        # Use existing embedder's batch method
-        embeddings = self.embedder.generate_embeddings_batch(texts)
+        embeddings = self._embed_texts(texts, batch_size)
         
         # Add embeddings to documents
+        embedded_documents = []
         for doc, embedding in zip(documents, embeddings):
+            if embedding is None:
+                continue
             doc["embedding"] = embedding
+            embedded_documents.append(doc)
         
-        print(f"Embeddings generated! Dimension: {len(embeddings[0]) if embeddings else 0}")
-        return documents
+        dimension = len(embedded_documents[0]["embedding"]) if embedded_documents else 0
+        print(f"Embeddings generated! Dimension: {dimension}")
+        return embedded_documents
+    
+    def _embed_texts(self, texts: List[str], batch_size: int) -> List[Optional[List[float]]]:
+        """
+        Batch-embed texts, splitting the batch in half on failure so one bad text
+        doesn't fail the whole portfolio. Texts that still fail on their own get None.
+        """
+        if not texts:
+            return []
+        
+        try:
+            return self.embedder.generate_embeddings_batch(texts, batch_size=batch_size)
+        except Exception as e:
+            if len(texts) == 1:
+                print(f"Error embedding document: {str(e)}")
+                return [None]
+            
+            mid = len(texts) // 2
+            return self._embed_texts(texts[:mid], batch_size) + self._embed_texts(texts[mid:], batch_size)
     
     def process_and_embed_repositories(self, repos_data: List[Dict]) -> List[Dict]:
         """
@@ -0,0 +1,168 @@
+"""
+Response caches for LLM calls.
+
+ExactResponseCache serves a response for a byte-identical prompt. SemanticCache stores
+LLM results under a tag (the exact-match part of the key, e.g. the state slice for
+agent decisions or the candidate set for rankings) and matches the free-text part
+(the job query) by cosine similarity of its embedding, so repeated or paraphrased
+requests in the same situation skip the LLM call.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from cachetools import TTLCache
+from services.embedder import embedder
+
+
+class SemanticCache:
+    """Thread-safe in-process semantic cache with per-entry TTL"""
+
+    def __init__(self, name: str, distance_threshold: float = 0.1, ttl: float = 3600, max_entries_per_tag: int = 64):
+        self.name = name
+        self.distance_threshold = distance_threshold
+        self.ttl = ttl
+        self.max_entries_per_tag = max_entries_per_tag
+        self._entries: Dict[str, List[Dict]] = {}
+        # Per-tag (N, dim) float32 matrix of the entry vectors, rebuilt only when a tag's entries change
+        self._matrices: Dict[str, np.ndarray] = {}
+        # Guards _entries/_matrices (and the counters) so a tag's matrix always matches its entries;
+        # embeddings are computed outside it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, prompt: str, tag: str, distance_threshold: Optional[float] = None) -> Optional[Any]:
+        """Return the cached response for the closest prompt under `tag`, or None on a miss"""
+        with self._lock:
+            entries = self._live_entries(tag)
+            if not entries:
+                self.misses += 1
+                return None
+
+            # Exact match first - no need to embed anything
+            for entry in entries:
+                if entry["prompt"] == prompt:
+                    self.hits += 1
+                    return entry["response"]
+
+            # entries is a snapshot (store() replaces the list rather than mutating it), so it stays
+            # aligned with this matrix after the lock is released
+            matrix = self._matrix(tag, entries)
+
+        threshold = self.distance_threshold if distance_threshold is None else distance_threshold
+        similarities = matrix @ self._embed(prompt)
+        best = int(np.argmax(similarities))
+        hit = 1.0 - float(similarities[best]) <= threshold
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entries[best]["response"] if hit else None
+
+    def store(self, prompt: str, response: Any, tag: str, ttl: Optional[float] = None, metadata: Optional[Dict] = None):
+        """Cache `response` for `prompt` under `tag`"""
+        entry = {
+            "prompt": prompt,
+            "vector": self._embed(prompt),
+            "response": response,
+            "metadata": metadata or {},
+            "expires_at": time.time() + (self.ttl if ttl is None else ttl)
+        }
+        with self._lock:
+            entries = self._live_entries(tag)
+            entries.append(entry)
+            # Drop the oldest entries once a tag is full
+            if len(entries) > self.max_entries_per_tag:
+                del entries[:len(entries) - self.max_entries_per_tag]
+            self._entries[tag] = entries
+            self._matrices.pop(tag, None)
+
+    def warm(self, prompt: str):
+        """Compute (and memoise) the embedding of a prompt that is about to be checked"""
+        self._embed(prompt)
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "tags": len(self._entries)
+        }
+
+    def _live_entries(self, tag: str) -> List[Dict]:
+        """Entries under `tag` that haven't expired, as a new list (call with the lock held)"""
+        now = time.time()
+        stored = self._entries.get(tag, [])
+        entries = [e for e in stored if e["expires_at"] > now]
+        if len(entries) != len(stored):
+            self._matrices.pop(tag, None)
+        if entries:
+            self._entries[tag] = entries
+        else:
+            self._entries.pop(tag, None)
+        return entries
+
+    def _matrix(self, tag: str, entries: List[Dict]) -> np.ndarray:
+        """
+        Contiguous float32 matrix of the vectors under `tag`, so a lookup is a single BLAS matrix-vector
+        product (call with the lock held)
+        """
+        matrix = self._matrices.get(tag)
+        if matrix is None:
+            matrix = np.stack([e["vector"] for e in entries]).astype(np.float32, copy=False)
+            self._matrices[tag] = matrix
+        return matrix
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _embed(text: str) -> np.ndarray:
+        """
+        Unit-normalised float32 embedding, so a dot product is the cosine similarity.
+        Memoised (a prompt is usually embedded for check() and again for store()); the array is read-only.
+        """
+        vector = embedder.generate_embedding_array(text)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+            vector.setflags(write=False)
+        return vector
+
+
+
+class ExactResponseCache:
+    """Thread-safe TTL cache of LLM responses keyed by a SHA-256 of the prompt parts"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Cache key for a prompt made of `parts` (non-strings, e.g. a missing name, are keyed by str())"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, response: Any):
+        with self._lock:
+            self._cache[key] = response
+
+
+# Student-service generations (resume feedback, cover letters, refinements), exact prompt match
+llm_response_cache = ExactResponseCache(maxsize=1024, ttl=3600)
+
+# GitHub portfolio analyses (raw JSON responses); the prompt embeds the portfolio, so entries can live longer
+github_analysis_cache = ExactResponseCache(maxsize=256, ttl=6 * 3600)
@@ -3,7 +3,7 @@ import os
 os.environ["HF_INFERENCE_ENDPOINT"] = "https://api-inference.huggingface.co"
 from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Iterator
 
 load_dotenv()
 
@@ -43,6 +43,8 @@ class LLMClient:
                 max_tokens=2000
             )
             
+            self._log_cached_tokens(response)
+            
             # Extract and return the response content
             return response.choices[0].message.content
             
@@ -50,6 +52,43 @@ class LLMClient:
             print(f"Error generating text: {e}")
             return f"Error: {str(e)}"
         
+    def generate_text_stream(self, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Streaming version of generate_text - yields text chunks as the LLM generates them.
+        
+        Args:
+            system_prompt: The system-level instruction
+            user_prompt: The user's input/query
+            temperature: Sampling temperature (0-1)
+            
+        Yields:
+            Chunks of the generated text response
+        """
+        try:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=2000,
+                stream=True
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+                    
+        except Exception as e:
+            print(f"Error streaming text: {e}")
+            yield f"Error: {str(e)}"
+        
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -78,11 +117,32 @@ class LLMClient:
                 temperature=temperature,
             )
             
+            self._log_cached_tokens(response)
+            
             return response.choices[0].message.content
             
         except Exception as e:
             print(f"Error in chat completion: {e}")
             return f"Error: {str(e)}"
+    
+    def warmup(self) -> None:
+        """Make a 1-token request so the HTTP connection (and provider routing) is set up before the first real call"""
+        self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": "hi"}],
+            max_tokens=1
+        )
+    
+    def _log_cached_tokens(self, response) -> None:
+        """
+        Log how many prompt tokens were served from the provider's prefix cache, if reported.
+        Prompts are built with the stable part (persona/instructions) first so repeated turns can hit it.
+        """
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        cached_tokens = getattr(details, "cached_tokens", None) if details else None
+        if cached_tokens:
+            print(f"Prompt cache hit: {cached_tokens}/{usage.prompt_tokens} prompt tokens cached")
         
 
 llm_client = LLMClient()
\ No newline at end of file
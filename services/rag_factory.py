@@ -1,4 +1,5 @@
 from typing import List, Dict, Any, Optional
+import asyncio
 from config.feature_flags import feature_flags
 from services.customrag_service import CustomRAGService
 from services.graphrag_service import GraphRAGService  
@@ -49,6 +50,35 @@ class RAGFactory:
         
         return self._standardize_results(results)
     
+    @time_this_function
+    async def search_candidates_async(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        filters: Optional[dict] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of search_candidates for callers on the event loop.
+        Custom RAG runs its async pipeline (retrieval in a worker thread, Cohere rerank on the
+        shared HTTP/2 client); Graph RAG is synchronous and runs in a worker thread.
+        """
+        if feature_flags.ENABLE_GRAPH_RAG:
+            print("Using Graph RAG")
+            results = await asyncio.to_thread(self._graph_rag_search, query_text, top_k, filters)
+        
+        elif feature_flags.ENABLE_CUSTOM_RAG:
+            print("Using Custom RAG")
+            results = await self.customrag_service.query_custom_rag_async(
+                query_text=query_text,
+                top_k=top_k,
+                filters=filters
+            )
+        
+        else:
+            raise ValueError("RAGFactory called but no RAG strategy enabled")
+        
+        return self._standardize_results(results)
+    
     def _custom_rag_search(self, query_text: str, top_k: int, filters: Optional[dict]) -> List[Dict[str, Any]]:
         return self.customrag_service.query_custom_rag(
             query_text=query_text,
@@ -169,4 +199,7 @@ class RAGFactory:
             standardized.append(standardized_result)
         
         print(f"Standardized {len(standardized)} results from {len(results)} raw results")
-        return standardized
\ No newline at end of file
+        return standardized
+
+# Shared factory so the services (and GraphRAG's lazily loaded reranker model) are created once per process
+rag_factory = RAGFactory()
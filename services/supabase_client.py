@@ -1,9 +1,18 @@
 import os
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
 load_dotenv()
 
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
\ No newline at end of file
+
+# One long-lived HTTP client for all PostgREST calls so connections (and their TLS handshakes) are reused
+supabase_http_client = httpx.Client(
+    http2=True,
+    timeout=30,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=30)
+)
+
+supabase: Client = create_client(url, key, options=ClientOptions(httpx_client=supabase_http_client))
\ No newline at end of file
@@ -2,6 +2,9 @@ from services.supabase_client import supabase
 from typing import List, Dict, Optional
 import ast
 
+# Max rows per multi-row insert, keeps each request under the PostgREST payload limit
+INSERT_BATCH_SIZE = 500
+
 class VectorStore:
     @staticmethod
     def store_resume_embedding(
@@ -121,6 +124,51 @@ class VectorStore:
         
         return response.data
     
+    @staticmethod
+    def search_candidates_enriched(
+        query_embedding: List[float],
+        top_k: int = 10,
+        threshold: float = 0.0
+    ) -> List[Dict]:
+        """
+            Resume search over the candidate_enriched materialized view: each match comes with its profile fields
+            (name, skills, github_username), a 500-char resume preview and the latest personality_data (or None)
+        """
+        response = supabase.rpc(
+            "match_candidates_enriched",
+            {
+                "query_embedding": query_embedding,
+                "match_count": top_k,
+                "match_threshold": threshold
+            }
+        ).execute()
+        
+        return response.data
+    
+    @staticmethod
+    def search_candidates_combined(
+        query_embedding: List[float],
+        top_k: int = 30,
+        threshold: float = 0.3,
+        doc_chars: int = 2000
+    ) -> List[Dict]:
+        """
+            Resume and GitHub chunk search in one call (match_candidates_combined): the best top_k matches
+            across both, each with source ('resume' / 'github'), student_id, student_name, doc_text (cut to
+            doc_chars) and similarity
+        """
+        response = supabase.rpc(
+            "match_candidates_combined",
+            {
+                "query_embedding": query_embedding,
+                "match_count": top_k,
+                "match_threshold": threshold,
+                "doc_chars": doc_chars
+            }
+        ).execute()
+        
+        return response.data
+    
     @staticmethod
     def get_resume_by_student_id(student_id: str) -> Optional[Dict]:
         """Get resume for a specific student"""
@@ -225,6 +273,7 @@ class VectorStore:
     ) -> List[Dict]:
         """
         Store multiple GitHub documents in batch.
+        Uses one multi-row insert per INSERT_BATCH_SIZE rows instead of a request per document.
         
         Args:
             documents: List of documents from GitHubDocumentProcessor
@@ -249,9 +298,19 @@ class VectorStore:
             for doc in documents
         ]
         
-        response = supabase.table("github_embeddings").insert(data_batch).execute()
-        print(f"Stored {len(response.data)} GitHub documents for student {student_id}")
-        return response.data
+        if not data_batch:
+            print(f"No GitHub documents to store for student {student_id}")
+            return []
+        
+        stored = []
+        for start in range(0, len(data_batch), INSERT_BATCH_SIZE):
+            response = supabase.table("github_embeddings")\
+                .insert(data_batch[start:start + INSERT_BATCH_SIZE])\
+                .execute()
+            stored.extend(response.data)
+        
+        print(f"Stored {len(stored)} GitHub documents for student {student_id}")
+        return stored
     
     @staticmethod
     def search_github_repos(
@@ -410,6 +469,11 @@ class VectorStore:
         Search across both resume and GitHub portfolio data using the unified RPC function.
         Creates a unified knowledge base view.
         
+        The RPC narrows to the student's rows by student_id index, ranks them by cosine similarity
+        server-side and only returns the columns
+        the chatbots read (source, resume_text, text, repo_name, similarity and metadata
+        trimmed to language/topics/stars) - see supabase/migrations.
+        
         Args:
             query_embedding: Query vector embedding
             student_id: Student ID (UUID)
@@ -0,0 +1,37 @@
+"""
+Startup warm-up for the shared clients.
+
+The first embedding, LLM call and Cohere rerank each pay one-off costs (model
+warm-up, TLS handshakes, connection set-up). Running a tiny call to each at
+startup keeps those costs out of the first user requests. Cohere only gets its
+connection opened - a warm-up rerank would be billed on every process start.
+"""
+
+import asyncio
+import logging
+import time
+from services.embedder import embedder
+from services.llm_client import llm_client
+from services.customrag_service import warm_async_cohere_client
+from services.db_pool import get_pool
+from services.agents.llm_routers.base_router import warm_tokenizers
+
+logger = logging.getLogger(__name__)
+
+
+async def warmup_clients():
+    """Warm every shared client concurrently; a failed warm-up is logged and otherwise ignored"""
+    start = time.time()
+    tasks = {
+        "embedder": asyncio.to_thread(embedder.generate_embedding, "warmup"),
+        "llm_client": asyncio.to_thread(llm_client.warmup),
+        "cohere_async": warm_async_cohere_client(),
+        "db_pool": get_pool(),
+        "router_tokenizers": asyncio.to_thread(warm_tokenizers)
+    }
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    for name, result in zip(tasks, results):
+        if isinstance(result, BaseException):
+            logger.warning("Warm-up of %s failed: %s", name, result)
+    logger.info("Client warm-up finished in %.2fs", time.time() - start)
@@ -0,0 +1,67 @@
+-- Unified portfolio search (resume + GitHub) used by VectorStore.search_unified_portfolio.
+-- The search is scoped to one student, so the student_id btree indexes narrow it to that
+-- student's handful of rows, which are then scored exactly (a vector index can't serve a
+-- per-student filter + union sort). Only the columns consumed by the chatbot endpoints are
+-- returned (metadata trimmed to language/topics/stars).
+
+create index if not exists resume_embeddings_student_id_idx
+    on resume_embeddings (student_id);
+
+create index if not exists github_embeddings_student_id_idx
+    on github_embeddings (student_id);
+
+-- The return type differs from earlier versions, which create or replace can't change
+drop function if exists match_student_portfolio(vector, uuid, float, int, text);
+
+create or replace function match_student_portfolio(
+    query_embedding vector(384),
+    filter_student_id uuid,
+    match_threshold float default 0.5,
+    match_count int default 10,
+    source_filter text default null
+)
+returns table (
+    source text,
+    resume_text text,
+    text text,
+    repo_name text,
+    metadata jsonb,
+    similarity float
+)
+language sql stable
+as $$
+    select *
+    from (
+        select
+            'resume'::text as source,
+            r.resume_text,
+            null::text as text,
+            null::text as repo_name,
+            '{}'::jsonb as metadata,
+            1 - (r.embedding <=> query_embedding) as similarity
+        from resume_embeddings r
+        where r.student_id = filter_student_id
+          and (source_filter is null or source_filter = 'resume')
+          and 1 - (r.embedding <=> query_embedding) > match_threshold
+
+        union all
+
+        select
+            'github'::text as source,
+            null::text as resume_text,
+            g.text,
+            g.repo_name,
+            jsonb_build_object(
+                'language', g.metadata->'language',
+                'topics', g.metadata->'topics',
+                'stars', g.metadata->'stars'
+            ) as metadata,
+            1 - (g.embedding <=> query_embedding) as similarity
+        from github_embeddings g
+        where g.student_id = filter_student_id
+          and (source_filter is null or source_filter = 'github')
+          and 1 - (g.embedding <=> query_embedding) > match_threshold
+    ) matches
+    order by matches.similarity desc
+    limit match_count;
+$$;
@@ -0,0 +1,137 @@
+-- Pre-joined candidate data for the agent's search: resume + profile + latest personality
+-- analysis in one row per student, so SearchCandidatesTool gets everything the ranker needs
+-- from a single query instead of separate profile and personality lookups.
+-- Writes to the source tables only mark the view stale (a one-row insert); a pg_cron job
+-- refreshes it (concurrently, so searches aren't blocked) at most once a minute when stale,
+-- so a burst of uploads / profile edits / interview analyses costs a single rebuild.
+
+create materialized view if not exists candidate_enriched as
+select distinct on (r.student_id)
+    r.student_id,
+    r.resume_text,
+    r.embedding,
+    p.name,
+    to_jsonb(p.skills) as skills,
+    p.github_username,
+    pa.personality_data
+from resume_embeddings r
+join profiles p on p.id = r.student_id
+left join lateral (
+    select jsonb_build_object(
+        'extraversion', a.extraversion,
+        'agreeableness', a.agreeableness,
+        'conscientiousness', a.conscientiousness,
+        'neuroticism', a.neuroticism,
+        'openness', a.openness,
+        'interview_score', a.interview_score
+    ) as personality_data
+    from personality_analyses a
+    where a.student_id = r.student_id
+    order by a.created_at desc
+    limit 1
+) pa on true
+-- Latest resume per student (id breaks created_at ties), so the searched embedding is deterministic
+order by r.student_id, r.created_at desc, r.id desc;
+
+-- Required for REFRESH ... CONCURRENTLY
+create unique index if not exists candidate_enriched_student_id_idx
+    on candidate_enriched (student_id);
+
+create index if not exists candidate_enriched_embedding_hnsw_idx
+    on candidate_enriched using hnsw (embedding vector_cosine_ops)
+    with (m = 16, ef_construction = 64);
+
+-- Pending changes to the view's source tables, one row per write statement. Writers only
+-- append here, so they never wait on (or lock against) a refresh.
+create table if not exists candidate_enriched_changes (
+    id bigint generated always as identity primary key,
+    changed_at timestamptz not null default now()
+);
+
+-- Statement trigger: record that the view is stale
+create or replace function mark_candidate_enriched_stale()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into candidate_enriched_changes default values;
+    return null;
+end;
+$$;
+
+-- Run by pg_cron: refresh only if something changed since the last refresh.
+-- Changes recorded while the refresh runs aren't consumed here, so they trigger the next one.
+create or replace function refresh_candidate_enriched_if_stale()
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    pending int;
+begin
+    with consumed as (
+        delete from candidate_enriched_changes returning 1
+    )
+    select count(*) into pending from consumed;
+
+    if pending > 0 then
+        refresh materialized view concurrently candidate_enriched;
+    end if;
+end;
+$$;
+
+create extension if not exists pg_cron;
+
+select cron.schedule(
+    'refresh_candidate_enriched',
+    '* * * * *',
+    'select refresh_candidate_enriched_if_stale()'
+);
+
+drop trigger if exists refresh_candidate_enriched on resume_embeddings;
+create trigger refresh_candidate_enriched
+    after insert or update or delete on resume_embeddings
+    for each statement execute function mark_candidate_enriched_stale();
+
+drop trigger if exists refresh_candidate_enriched on profiles;
+create trigger refresh_candidate_enriched
+    after insert or update or delete on profiles
+    for each statement execute function mark_candidate_enriched_stale();
+
+drop trigger if exists refresh_candidate_enriched on personality_analyses;
+create trigger refresh_candidate_enriched
+    after insert or update or delete on personality_analyses
+    for each statement execute function mark_candidate_enriched_stale();
+
+create or replace function match_candidates_enriched(
+    query_embedding vector(384),
+    match_threshold float default 0.0,
+    match_count int default 10
+)
+returns table (
+    student_id uuid,
+    resume_text text,
+    similarity float,
+    name text,
+    skills jsonb,
+    github_username text,
+    personality_data jsonb
+)
+language sql stable
+as $$
+    select
+        c.student_id,
+        left(c.resume_text, 500) as resume_text,
+        1 - (c.embedding <=> query_embedding) as similarity,
+        c.name,
+        c.skills,
+        c.github_username,
+        c.personality_data
+    from candidate_enriched c
+    where 1 - (c.embedding <=> query_embedding) > match_threshold
+    order by c.embedding <=> query_embedding
+    limit match_count;
+$$;
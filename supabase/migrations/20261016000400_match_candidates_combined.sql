@@ -0,0 +1,61 @@
+-- Resume + GitHub chunk search in one call, used by VectorStore.search_candidates_combined
+-- for Custom RAG retrieval: one round trip instead of match_resumes + match_github_chunks,
+-- with the overall top-k picked server-side. Each branch is an HNSW index scan with its
+-- own limit; the union is then cut to the best match_count rows.
+
+-- Global nearest-neighbour scans ("order by embedding <=> q limit n" over a whole table)
+-- are what HNSW indexes serve
+create index if not exists resume_embeddings_embedding_hnsw_idx
+    on resume_embeddings using hnsw (embedding vector_cosine_ops)
+    with (m = 16, ef_construction = 64);
+
+create index if not exists github_embeddings_embedding_hnsw_idx
+    on github_embeddings using hnsw (embedding vector_cosine_ops)
+    with (m = 16, ef_construction = 64);
+
+create or replace function match_candidates_combined(
+    query_embedding vector(384),
+    match_threshold float default 0.3,
+    match_count int default 30
+)
+returns table (
+    source text,
+    student_id uuid,
+    student_name text,
+    doc_text text,
+    similarity float
+)
+language sql stable
+as $$
+    select matches.source, matches.student_id, p.name as student_name, matches.doc_text, matches.similarity
+    from (
+        (
+            select
+                'resume'::text as source,
+                r.student_id,
+                r.resume_text as doc_text,
+                1 - (r.embedding <=> query_embedding) as similarity
+            from resume_embeddings r
+            where 1 - (r.embedding <=> query_embedding) > match_threshold
+            order by r.embedding <=> query_embedding
+            limit match_count
+        )
+
+        union all
+
+        (
+            select
+                'github'::text as source,
+                g.student_id,
+                g.text as doc_text,
+                1 - (g.embedding <=> query_embedding) as similarity
+            from github_embeddings g
+            where 1 - (g.embedding <=> query_embedding) > match_threshold
+            order by g.embedding <=> query_embedding
+            limit match_count
+        )
+    ) matches
+    left join profiles p on p.id = matches.student_id
+    order by matches.similarity desc
+    limit match_count;
+$$;
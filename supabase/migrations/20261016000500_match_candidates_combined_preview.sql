@@ -0,0 +1,53 @@
+-- match_candidates_combined: return only the first doc_chars characters of each document
+-- (what the reranker is sent), so full resumes never cross the wire during retrieval.
+-- Custom RAG fetches the full resume text for the final top-k candidates only.
+
+drop function if exists match_candidates_combined(vector, float, int);
+
+create or replace function match_candidates_combined(
+    query_embedding vector(384),
+    match_threshold float default 0.3,
+    match_count int default 30,
+    doc_chars int default 2000
+)
+returns table (
+    source text,
+    student_id uuid,
+    student_name text,
+    doc_text text,
+    similarity float
+)
+language sql stable
+as $$
+    select matches.source, matches.student_id, p.name as student_name, matches.doc_text, matches.similarity
+    from (
+        (
+            select
+                'resume'::text as source,
+                r.student_id,
+                left(r.resume_text, doc_chars) as doc_text,
+                1 - (r.embedding <=> query_embedding) as similarity
+            from resume_embeddings r
+            where 1 - (r.embedding <=> query_embedding) > match_threshold
+            order by r.embedding <=> query_embedding
+            limit match_count
+        )
+
+        union all
+
+        (
+            select
+                'github'::text as source,
+                g.student_id,
+                left(g.text, doc_chars) as doc_text,
+                1 - (g.embedding <=> query_embedding) as similarity
+            from github_embeddings g
+            where 1 - (g.embedding <=> query_embedding) > match_threshold
+            order by g.embedding <=> query_embedding
+            limit match_count
+        )
+    ) matches
+    left join profiles p on p.id = matches.student_id
+    order by matches.similarity desc
+    limit match_count;
+$$;
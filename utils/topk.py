@@ -0,0 +1,13 @@
+import numpy as np
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (partial selection instead of a full sort)"""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(n)
+    # Stable sort so tied scores among the winners keep their original order
+    return idx[np.argsort(-scores[idx], kind="stable")]